@@ -0,0 +1,247 @@
+import os
+import csv
+import json
+import time
+import argparse
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+import cv2
+from tracker_registry import TRACKER_TYPES, default_trackers
+from headless_tracker import parse_bbox, read_bbox_file, run_video, write_trajectory
+from trajectory_cache import DEFAULT_CACHE_DIR, TrajectoryCache
+from evaluation import evaluate_batch, gt_scale, load_ground_truth, load_trajectory
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm')
+
+SUMMARY_FIELDS = ['video', 'tracker', 'status', 'frames', 'fps', 'mean_ms', 'p50_ms', 'p95_ms',
+                  'p99_ms', 'lost_frames', 'lost', 'recovered', 'wall_s', 'cached', 'auc', 'precision_20', 'mean_iou',
+                  'mean_center_error', 'trajectory', 'error']
+
+GROUND_TRUTH_SUFFIXES = ('.gt.csv', '.gt.txt')
+
+# Jobs stop themselves at the timeout; one still running this much later
+# (e.g. stuck in a decode) is killed
+KILL_GRACE_S = 10.0
+
+
+def ground_truth_for(video):
+    # Optional "<video>.gt.csv" or "<video>.gt.txt" next to the video
+    for suffix in GROUND_TRUTH_SUFFIXES:
+        if os.path.exists(video + suffix):
+            return video + suffix
+    return None
+
+
+def load_manifest(path):
+    # JSON: [{"video": ..., "bbox": [x, y, w, h], "ground_truth": ...}]; CSV/text:
+    # video,x,y,w,h per line. Ground truth not given in JSON falls back to sidecars.
+    base = os.path.dirname(os.path.abspath(path))
+    entries = []
+    ground_truth = {}
+    if path.endswith('.json'):
+        with open(path) as f:
+            for item in json.load(f):
+                entries.append((item['video'], tuple(float(v) for v in item['bbox'])))
+                if item.get('ground_truth'):
+                    ground_truth[item['video']] = item['ground_truth']
+    else:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                video, box = line.split(',', 1)
+                entries.append((video.strip(), parse_bbox(box)))
+    resolved = []
+    for video, bbox in entries:
+        gt = ground_truth.get(video)
+        video = video if os.path.isabs(video) else os.path.join(base, video)
+        gt = (gt if os.path.isabs(gt) else os.path.join(base, gt)) if gt else ground_truth_for(video)
+        resolved.append((video, bbox, gt))
+    return resolved
+
+
+def scan_directory(path):
+    # Every video needs a sibling "<video>.bbox" file holding its initial box
+    entries = []
+    for name in sorted(os.listdir(path)):
+        if not name.lower().endswith(VIDEO_EXTENSIONS):
+            continue
+        video = os.path.join(path, name)
+        bbox_path = video + '.bbox'
+        if os.path.exists(bbox_path):
+            entries.append((video, read_bbox_file(bbox_path), ground_truth_for(video)))
+        else:
+            print(f'Skipping {name}: no {name}.bbox file')
+    return entries
+
+
+def init_worker():
+    # Jobs already run one per core, so keep OpenCV from oversubscribing
+    cv2.setNumThreads(1)
+
+
+def run_job(video, bbox, tracker, output_dir, target_width, target_height, timeout, cache_dir=None):
+    cache = TrajectoryCache(cache_dir) if cache_dir else None
+    trajectories, report = run_video(video, bbox, [tracker], target_width, target_height,
+                                     parallel=False, timeout=timeout, cache=cache)
+    trajectory_path = os.path.join(output_dir, f'{tracker}_trajectory.csv')
+    write_trajectory(trajectory_path, trajectories[tracker])
+    stats = report['trackers'][tracker]
+    return {
+        'status': 'timeout' if report['timed_out'] else 'ok',
+        'frames': report['frames'],
+        'fps': stats.get('fps', 0.0),
+        'mean_ms': stats.get('mean_ms'),
+        'p50_ms': stats.get('p50_ms'),
+        'p95_ms': stats.get('p95_ms'),
+        'p99_ms': stats.get('p99_ms'),
+        'lost_frames': stats.get('lost_frames'),
+        'lost': stats.get('lost'),
+        'recovered': stats.get('recovered'),
+        'wall_s': report['wall_s'],
+        'cached': stats['cached'],
+        'trajectory': trajectory_path,
+        'gt_scale': gt_scale(report),
+    }
+
+
+def job_process(conn, args):
+    # Runs one job in its own process so an overrunning job can be killed
+    init_worker()
+    try:
+        conn.send(('ok', run_job(*args)))
+    except Exception as e:
+        conn.send(('error', str(e)))
+    finally:
+        conn.close()
+
+
+def run_batch(entries, tracker_names, output_dir, workers=None, timeout=None,
+              target_width=1280, target_height=720, cache_dir=None):
+    workers = workers or os.cpu_count() or 1
+    jobs = deque()
+    rows = []
+    for video, bbox, _ in entries:
+        stem = os.path.splitext(os.path.basename(video))[0]
+        job_dir = os.path.join(output_dir, stem)
+        os.makedirs(job_dir, exist_ok=True)
+        for tracker in tracker_names:
+            jobs.append((len(rows), (video, bbox, tracker, job_dir, target_width, target_height, timeout, cache_dir)))
+            rows.append({'video': video, 'tracker': tracker})
+    running = {}
+    while jobs or running:
+        while jobs and len(running) < workers:
+            i, args = jobs.popleft()
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=job_process, args=(sender, args), daemon=True)
+            process.start()
+            sender.close()
+            # The deadline counts from when the job starts
+            deadline = None if timeout is None else time.monotonic() + timeout + KILL_GRACE_S
+            running[receiver] = (i, process, deadline)
+        deadlines = [deadline for _, _, deadline in running.values() if deadline is not None]
+        wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+        ready = wait(list(running), wait_for)
+        for receiver in list(running):
+            i, process, deadline = running[receiver]
+            if receiver in ready:
+                try:
+                    status, result = receiver.recv()
+                except EOFError:
+                    status, result = 'error', f'worker exited with code {process.exitcode}'
+                if status == 'ok':
+                    rows[i].update(result)
+                else:
+                    rows[i].update(status='error', error=result)
+            elif deadline is not None and time.monotonic() >= deadline:
+                process.terminate()
+                rows[i]['status'] = 'timeout'
+            else:
+                continue
+            process.join()
+            receiver.close()
+            del running[receiver]
+    return rows
+
+
+def score_rows(rows, entries):
+    # Scores every finished job against its video's ground truth in one
+    # vectorized pass, after the pool is done. A timed-out job only covers
+    # the start of the video, so it is left unscored rather than ranked
+    # against complete runs.
+    ground_truth = {video: gt for video, _, gt in entries if gt}
+    loaded = {}
+    scored = []
+    for row in rows:
+        scale = row.pop('gt_scale', 1.0)
+        gt_path = ground_truth.get(row['video'])
+        if gt_path and row.get('trajectory') and row.get('status') == 'ok':
+            if gt_path not in loaded:
+                loaded[gt_path] = load_ground_truth(gt_path)
+            scored.append((row, load_trajectory(row['trajectory']), loaded[gt_path], scale))
+    if not scored:
+        return
+    results = evaluate_batch([s[1] for s in scored], [s[2] for s in scored], [s[3] for s in scored])
+    for (row, _, _, _), result in zip(scored, results):
+        for field in ('auc', 'precision_20', 'mean_iou', 'mean_center_error'):
+            row[field] = result[field]
+
+
+def write_summary(output_dir, rows):
+    with open(os.path.join(output_dir, 'summary.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+    with open(os.path.join(output_dir, 'summary.json'), 'w') as f:
+        json.dump(rows, f, indent=2)
+
+
+def print_summary(rows):
+    print(f"{'video':<24} {'tracker':<10} {'status':<8} {'frames':>6} {'fps':>8} {'p95 ms':>8} {'lost':>5} "
+          f"{'AUC':>6}")
+    for row in rows:
+        fps = f"{row['fps']:.1f}" if row.get('fps') is not None else '-'
+        p95 = f"{row['p95_ms']:.2f}" if row.get('p95_ms') is not None else '-'
+        auc = f"{row['auc']:.3f}" if row.get('auc') is not None else '-'
+        print(f"{os.path.basename(row['video']):<24} {row['tracker']:<10} {row['status']:<8} "
+              f"{row.get('frames', '-'):>6} {fps:>8} {p95:>8} {row.get('lost_frames', '-'):>5} {auc:>6}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Run every (video, tracker) pair on a process pool.')
+    parser.add_argument('source', help='Directory of videos with <video>.bbox (and optional <video>.gt.csv) '
+                                       'files, or a .json/.csv manifest')
+    parser.add_argument('--trackers', nargs='+', choices=list(TRACKER_TYPES.keys()),
+                        default=default_trackers(), help='Trackers to run')
+    parser.add_argument('--output-dir', default='batch_results', help='Directory for trajectories and summary')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--timeout', type=float, default=None, help='Per-job time limit in seconds')
+    parser.add_argument('--cache', action='store_true', help='Reuse and store trajectories in the trajectory cache')
+    parser.add_argument('--cache-dir', default=None, help='Trajectory cache directory (implies --cache)')
+    parser.add_argument('--width', type=int, default=1280, help='Target frame width')
+    parser.add_argument('--height', type=int, default=720, help='Target frame height')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    entries = scan_directory(args.source) if os.path.isdir(args.source) else load_manifest(args.source)
+    if not entries:
+        print('No videos to process')
+        return
+    os.makedirs(args.output_dir, exist_ok=True)
+    start = time.perf_counter()
+    cache_dir = args.cache_dir or (DEFAULT_CACHE_DIR if args.cache else None)
+    rows = run_batch(entries, args.trackers, args.output_dir, args.workers, args.timeout,
+                     args.width, args.height, cache_dir)
+    score_rows(rows, entries)
+    write_summary(args.output_dir, rows)
+    print_summary(rows)
+    print(f'{len(rows)} jobs in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import os
+import sys
+import mmap
+import argparse
+import tempfile
+import cv2
+import numpy as np
+from export_video import concat_avi, read_avi_layout
+
+
+def numbered_frame(i, width, height):
+    # A gradient plus the frame number, so frames are easy to tell apart
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[:] = np.linspace(0, 255, width, dtype=np.uint8)[None, :, None]
+    frame[:, :, 1] = (i * 37) % 256
+    cv2.putText(frame, str(i), (20, height - 20), cv2.FONT_HERSHEY_SIMPLEX, 2.0, (255, 255, 255), 4)
+    return frame
+
+
+def write_segment(path, frames, width, height, fps=30):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'XVID'), fps, (width, height))
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+
+
+def decode(path):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    reported = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return frames, reported
+
+
+def check_concat(lengths=(23, 31, 17), width=320, height=240, max_error=8.0):
+    # Joins XVID segments with concat_avi and returns a list of problems:
+    # the joined file must decode to every frame, in order, and report the
+    # right frame count in its headers
+    problems = []
+    with tempfile.TemporaryDirectory() as tmp:
+        paths, expected = [], []
+        for n, length in enumerate(lengths):
+            frames = [numbered_frame(len(expected) + i, width, height) for i in range(length)]
+            paths.append(os.path.join(tmp, f'segment_{n}.avi'))
+            write_segment(paths[-1], frames, width, height)
+            expected.extend(frames)
+        output = os.path.join(tmp, 'joined.avi')
+        joined = concat_avi(paths, output)
+        if joined != len(expected):
+            problems.append(f'concat_avi reported {joined} frames, expected {len(expected)}')
+        with open(output, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                _, chunks, flags = read_avi_layout(data)
+            finally:
+                data.close()
+        if len(chunks) != len(expected) or len(flags) != len(expected):
+            problems.append(f'{len(chunks)} chunks and {len(flags)} index entries for {len(expected)} frames')
+        decoded, reported = decode(output)
+        if len(decoded) != len(expected):
+            problems.append(f'decoded {len(decoded)} frames, expected {len(expected)}')
+        if reported != len(expected):
+            problems.append(f'header reports {reported} frames, expected {len(expected)}')
+        for i, (frame, original) in enumerate(zip(decoded, expected)):
+            error = np.abs(frame.astype(np.int16) - original).mean()
+            if error > max_error:
+                problems.append(f'frame {i} differs from its source by {error:.1f} on average')
+                break
+    return problems
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Round-trip check for joining AVI segments without re-encoding.')
+    parser.add_argument('--lengths', nargs='+', type=int, default=[23, 31, 17], help='Frames in each segment')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    problems = check_concat(args.lengths)
+    for problem in problems:
+        print(f'FAIL: {problem}')
+    if not problems:
+        print(f'OK: {len(args.lengths)} segments, {sum(args.lengths)} frames joined and decoded')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
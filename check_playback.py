@@ -0,0 +1,107 @@
+import os
+import sys
+import argparse
+import tempfile
+import traceback
+import cv2
+import numpy as np
+
+# The GUI is driven without a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication, QFileDialog  # noqa: E402
+from tracker_opencv import TrackerApp  # noqa: E402
+
+
+def write_video(path, frames, width=640, height=360, size=60):
+    # A textured square drifting right over a noisy background
+    rng = np.random.default_rng(0)
+    background = cv2.GaussianBlur(rng.integers(40, 140, (height, width, 3), dtype=np.uint8), (15, 15), 0)
+    texture = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (width, height))
+    for i in range(frames):
+        frame = background.copy()
+        x = 40 + i * 2
+        frame[150:150 + size, x:x + size] = texture
+        writer.write(frame)
+    writer.release()
+
+
+def open_app(path):
+    app = TrackerApp()
+    app.use_trajectory_cache = False
+    app.tracker_names = ['MOSSE', 'KCF']
+    QFileDialog.getOpenFileName = staticmethod(lambda *args, **kwargs: (path, ''))
+    # Play asks where to save the result video; no file means no saving
+    QFileDialog.getSaveFileName = staticmethod(lambda *args, **kwargs: ('', ''))
+    app.load_video()
+    return app
+
+
+def start_tracking(app):
+    scale = app.frame.shape[1] / 640
+    app.video_display.bbox = tuple(v * scale for v in (40 + app.current_frame_number() * 2, 150, 60, 60))
+    app.on_roi_selected()
+    app.toggle_play()
+
+
+def play(app, frames):
+    # Runs the timer's slot directly so an exception surfaces here instead
+    # of aborting the Qt event loop
+    for _ in range(frames):
+        if app.paused:
+            break
+        app.update_frame()
+
+
+def check_realtime_playback(frames=90):
+    # Returns a list of problems: resetting or seeking during real-time
+    # playback must leave the GUI in a state it can keep playing from
+    problems = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'clip.avi')
+        write_video(path, frames)
+        app = open_app(path)
+        try:
+            app.set_realtime(True)
+            start_tracking(app)
+            play(app, 10)
+            for action, step in (('reset', app.reset), ('seek', lambda: app.seek_to(frames // 2))):
+                try:
+                    step()
+                    if action == 'seek' and not app.paused:
+                        problems.append('still playing after a seek cleared the targets')
+                    play(app, 5)
+                    if not app.paused and not app.play_btn.isEnabled():
+                        problems.append(f'playing after {action} with Pause disabled')
+                    if app.paused:
+                        start_tracking(app)
+                        play(app, 5)
+                except Exception:
+                    problems.append(f'{action} during real-time playback raised:\n{traceback.format_exc()}')
+        finally:
+            app.timer.stop()
+            app.close()
+    return problems
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Check that the GUI survives reset and seek during playback.')
+    parser.add_argument('--frames', type=int, default=90, help='Frames in the generated clip')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    qt_app = QApplication.instance() or QApplication(sys.argv[:1])
+    problems = check_realtime_playback(args.frames)
+    for problem in problems:
+        print(f'FAIL: {problem}')
+    if not problems:
+        print('OK: reset and seek during real-time playback')
+    qt_app.quit()
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
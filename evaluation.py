@@ -0,0 +1,204 @@
+import os
+import csv
+import json
+import glob
+import argparse
+import numpy as np
+
+# OTB-style thresholds: IoU for the success plot, pixels for precision
+OVERLAP_THRESHOLDS = np.linspace(0.0, 1.0, 21)
+ERROR_THRESHOLDS = np.arange(0, 51, dtype=np.float64)
+
+
+def load_ground_truth(path):
+    # Either frame,x,y,w,h rows (header optional) or OTB-style x,y,w,h lines
+    # with one line per frame. Returns (N, 4) with NaN rows for missing frames.
+    rows = []
+    with open(path) as f:
+        for line in f:
+            values = line.replace(',', ' ').replace('\t', ' ').split()
+            try:
+                rows.append([float(v) for v in values])
+            except ValueError:
+                continue
+    if not rows:
+        return np.zeros((0, 4))
+    if len(rows[0]) == 4:
+        return np.asarray(rows, dtype=np.float64)
+    data = np.asarray([row[:5] for row in rows], dtype=np.float64)
+    boxes = np.full((int(data[:, 0].max()) + 1, 4), np.nan)
+    boxes[data[:, 0].astype(int)] = data[:, 1:5]
+    return boxes
+
+
+def trajectory_boxes(rows):
+    # (N, 4) array from (frame, success, x, y, w, h) rows; NaN where the
+    # tracker reported failure
+    if not rows:
+        return np.zeros((0, 4))
+    data = np.asarray(rows, dtype=np.float64)
+    boxes = np.full((int(data[:, 0].max()) + 1, 4), np.nan)
+    ok = data[:, 1] != 0
+    boxes[data[ok, 0].astype(int)] = data[ok, 2:6]
+    return boxes
+
+
+def history_boxes(history):
+    # (N, 4) array from a {frame_number: bbox or None} mapping
+    boxes = np.full((max(history) + 1 if history else 0, 4), np.nan)
+    frames = [frame for frame, box in history.items() if box is not None]
+    if frames:
+        boxes[frames] = [history[frame] for frame in frames]
+    return boxes
+
+
+def load_trajectory(path):
+    with open(path, newline='') as f:
+        rows = [(int(r['frame']), int(r['success']), float(r['x']), float(r['y']), float(r['w']), float(r['h']))
+                for r in csv.DictReader(f)]
+    return trajectory_boxes(rows)
+
+
+def align(pred, gt):
+    # Crops both to the common length and drops frames without ground truth
+    n = min(len(pred), len(gt))
+    pred, gt = pred[:n], gt[:n]
+    valid = ~np.isnan(gt).any(axis=1)
+    return pred[valid], gt[valid]
+
+
+def iou(a, b):
+    # Row-wise IoU of (N, 4) x, y, w, h arrays; NaN predictions score 0
+    x1 = np.maximum(a[:, 0], b[:, 0])
+    y1 = np.maximum(a[:, 1], b[:, 1])
+    x2 = np.minimum(a[:, 0] + a[:, 2], b[:, 0] + b[:, 2])
+    y2 = np.minimum(a[:, 1] + a[:, 3], b[:, 1] + b[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    union = a[:, 2] * a[:, 3] + b[:, 2] * b[:, 3] - inter
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.nan_to_num(inter / union, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def center_error(a, b):
+    # Row-wise distance between box centres; NaN predictions are infinitely far
+    dx = (a[:, 0] + a[:, 2] / 2) - (b[:, 0] + b[:, 2] / 2)
+    dy = (a[:, 1] + a[:, 3] / 2) - (b[:, 1] + b[:, 3] / 2)
+    return np.nan_to_num(np.hypot(dx, dy), nan=np.inf)
+
+
+def evaluate(pred, gt, gt_scale=1.0):
+    # gt_scale maps ground truth into the coordinates the trajectory uses,
+    # e.g. the resize factor applied before tracking
+    return evaluate_batch([pred], [gt], [gt_scale])[0]
+
+
+def threshold_counts(values, sequence_ids, sequences, thresholds):
+    # Per-sequence histogram of how many thresholds lie below each value:
+    # row s, column k counts frames of sequence s with exactly k thresholds < value
+    bins = np.searchsorted(thresholds, values, side='left')
+    width = len(thresholds) + 1
+    counts = np.bincount(sequence_ids * width + bins, minlength=sequences * width)
+    return counts.reshape(sequences, width)
+
+
+def evaluate_batch(preds, gts, gt_scales=None):
+    # Scores many sequences at once: every frame of every sequence is
+    # concatenated so IoU, centre error and both curves come out of a few
+    # array operations and one bincount each, whatever the sequence count.
+    gt_scales = gt_scales if gt_scales is not None else [1.0] * len(preds)
+    aligned = [align(np.asarray(p, dtype=np.float64).reshape(-1, 4), np.asarray(g, dtype=np.float64).reshape(-1, 4) * s)
+               for p, g, s in zip(preds, gts, gt_scales)]
+    sequences = len(aligned)
+    lengths = np.array([len(p) for p, _ in aligned], dtype=np.int64)
+    sequence_ids = np.repeat(np.arange(sequences), lengths)
+    pred = np.concatenate([p for p, _ in aligned]) if sequences else np.zeros((0, 4))
+    gt = np.concatenate([g for _, g in aligned]) if sequences else np.zeros((0, 4))
+    overlaps = iou(pred, gt)
+    errors = center_error(pred, gt)
+    finite = np.isfinite(errors)
+    frames = np.maximum(lengths, 1)[:, None]
+    # overlap > t: more than k thresholds lie below it, so sum the tail
+    histogram = threshold_counts(overlaps, sequence_ids, sequences, OVERLAP_THRESHOLDS)
+    success = np.cumsum(histogram[:, ::-1], axis=1)[:, ::-1][:, 1:] / frames
+    # error <= t_k: at most k thresholds lie below it, so sum the head
+    histogram = threshold_counts(errors, sequence_ids, sequences, ERROR_THRESHOLDS)
+    precision = np.cumsum(histogram, axis=1)[:, :-1] / frames
+    iou_sums = np.bincount(sequence_ids, overlaps, minlength=sequences)
+    error_sums = np.bincount(sequence_ids, np.where(finite, errors, 0.0), minlength=sequences)
+    finite_counts = np.bincount(sequence_ids, finite, minlength=sequences)
+    success_50 = np.bincount(sequence_ids, overlaps > 0.5, minlength=sequences) / frames[:, 0]
+    results = []
+    for i in range(sequences):
+        results.append({
+            'frames': int(lengths[i]),
+            'mean_iou': float(iou_sums[i] / frames[i, 0]),
+            'mean_center_error': float(error_sums[i] / finite_counts[i]) if finite_counts[i] else None,
+            'auc': float(success[i].mean()),
+            'success_50': float(success_50[i]),
+            'precision_20': float(precision[i, 20]),
+            'success_curve': success[i].tolist(),
+            'precision_curve': precision[i].tolist(),
+        })
+    return results
+
+
+def score_trajectories(trajectories, gt, gt_scale=1.0):
+    # {tracker: rows} from run_video -> {tracker: summary}
+    names = list(trajectories)
+    results = evaluate_batch([trajectory_boxes(trajectories[name]) for name in names],
+                             [gt] * len(names), [gt_scale] * len(names))
+    return dict(zip(names, results))
+
+
+def gt_scale(report):
+    # Ground truth is usually in source pixels while trajectories are in the
+    # resized frame the trackers saw
+    try:
+        return report['frame_size'][0] / report['source_size'][0]
+    except (KeyError, ZeroDivisionError):
+        return 1.0
+
+
+def gt_scale_from_report(report_path):
+    try:
+        with open(report_path) as f:
+            return gt_scale(json.load(f))
+    except (OSError, ValueError):
+        return 1.0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Score tracker trajectories against ground truth.')
+    parser.add_argument('ground_truth', help='Ground-truth file: frame,x,y,w,h rows or x,y,w,h lines')
+    parser.add_argument('trajectories', nargs='+',
+                        help='<tracker>_trajectory.csv files or directories containing them')
+    parser.add_argument('--gt-scale', type=float, default=None,
+                        help='Scale applied to ground truth (default: from report.json, else 1.0)')
+    parser.add_argument('--output', help='Write full results, including curves, as JSON')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    gt = load_ground_truth(args.ground_truth)
+    paths = []
+    for item in args.trajectories:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, '*_trajectory.csv'))))
+        else:
+            paths.append(item)
+    scales = [args.gt_scale if args.gt_scale is not None else
+              gt_scale_from_report(os.path.join(os.path.dirname(path), 'report.json')) for path in paths]
+    results = evaluate_batch([load_trajectory(path) for path in paths], [gt] * len(paths), scales)
+    print(f"{'trajectory':<40} {'AUC':>6} {'P@20':>6} {'SR@0.5':>7} {'IoU':>6} {'CE px':>8}")
+    for path, result in zip(paths, results):
+        error = f"{result['mean_center_error']:.1f}" if result['mean_center_error'] is not None else '-'
+        print(f"{path[-40:]:<40} {result['auc']:6.3f} {result['precision_20']:6.3f} "
+              f"{result['success_50']:7.3f} {result['mean_iou']:6.3f} {error:>8}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(dict(zip(paths, results)), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
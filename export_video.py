@@ -0,0 +1,311 @@
+import os
+import glob
+import json
+import mmap
+import time
+import struct
+import shutil
+import tempfile
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from tracker_registry import TRACKERS, TRACKER_COLORS
+from overlays import draw_box, draw_legend, draw_reference_intro
+from evaluation import load_trajectory
+from video_io import FrameIndex, read_frame_at
+from batch_eval import init_worker
+
+# Segments shorter than this cost more in seeking and process start-up
+# than they save
+MIN_SEGMENT_FRAMES = 30
+
+AVIIF_KEYFRAME = 0x10
+# idx1 offsets and RIFF sizes are 32-bit; past this the segments are re-encoded
+AVI_SIZE_LIMIT = 2 ** 31 - 2 ** 20
+
+
+def load_results(results_dir, tracker_names=None):
+    # report.json and <tracker>_trajectory.csv files as written by
+    # headless_tracker --output-dir; boxes are (N, 4) with NaN where lost
+    with open(os.path.join(results_dir, 'report.json')) as f:
+        report = json.load(f)
+    if tracker_names is None:
+        found = {os.path.basename(path)[:-len('_trajectory.csv')]
+                 for path in glob.glob(os.path.join(results_dir, '*_trajectory.csv'))}
+        # Registry order, so the legend matches the GUI's
+        tracker_names = [name for name in TRACKERS if name in found]
+    boxes = {name: load_trajectory(os.path.join(results_dir, f'{name}_trajectory.csv')) for name in tracker_names}
+    return report, boxes
+
+
+def split_segments(frames, workers):
+    count = max(1, min(workers, frames // MIN_SEGMENT_FRAMES))
+    bounds = np.linspace(0, frames, count + 1).astype(int)
+    return [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def output_fourcc(path):
+    return cv2.VideoWriter_fourcc(*'XVID') if path.endswith('.avi') else cv2.VideoWriter_fourcc(*'mp4v')
+
+
+def render_segment(video, path, start, end, boxes, frame_size, fps, initial_bbox=None, timestamps=None):
+    # Draws frames [start, end) into their own file. Frame 0 becomes the
+    # reference intro held for a second, like the GUI writes before playing.
+    # With the frame index's timestamps, seeks are checked against them.
+    index = None
+    if timestamps is not None:
+        index = FrameIndex(video)
+        index.set_timestamps(timestamps)
+    cap = cv2.VideoCapture(video)
+    writer = cv2.VideoWriter(path, output_fourcc(path), fps, tuple(frame_size))
+    names = list(boxes)
+    written = 0
+    try:
+        ret, frame = read_frame_at(cap, start, index)
+        for frame_number in range(start, end):
+            if frame_number > start:
+                ret, frame = cap.read()
+            if not ret:
+                break
+            if (frame.shape[1], frame.shape[0]) != tuple(frame_size):
+                frame = cv2.resize(frame, tuple(frame_size), interpolation=cv2.INTER_AREA)
+            if frame_number == 0:
+                if initial_bbox is not None:
+                    draw_reference_intro(frame, initial_bbox)
+                    for _ in range(int(fps)):
+                        writer.write(frame)
+                        written += 1
+                continue
+            for name in names:
+                row = frame_number - start
+                if row < len(boxes[name]) and not np.isnan(boxes[name][row]).any():
+                    draw_box(frame, boxes[name][row], TRACKER_COLORS[name], name)
+            draw_legend(frame, names)
+            writer.write(frame)
+            written += 1
+    finally:
+        writer.release()
+        cap.release()
+    return written
+
+
+def riff_chunks(data, start, end):
+    # (fourcc, list type or None, offset, size) of each chunk in data[start:end]
+    offset = start
+    while offset + 8 <= end:
+        fourcc = bytes(data[offset:offset + 4])
+        size = struct.unpack_from('<I', data, offset + 4)[0]
+        kind = bytes(data[offset + 8:offset + 12]) if fourcc in (b'RIFF', b'LIST') else None
+        yield fourcc, kind, offset, size
+        offset += 8 + size + (size & 1)
+
+
+def read_avi_layout(data):
+    # hdrl list, stream chunks and idx1 flags of a single-RIFF AVI file
+    riffs = list(riff_chunks(data, 0, len(data)))
+    if not riffs or riffs[0][:2] != (b'RIFF', b'AVI ') or len(riffs) > 1:
+        raise ValueError('Not a single-RIFF AVI file')
+    _, _, offset, size = riffs[0]
+    hdrl = movi = None
+    flags = []
+    for fourcc, kind, child, child_size in riff_chunks(data, offset + 12, offset + 8 + size):
+        if kind == b'hdrl':
+            hdrl = (child, child_size)
+        elif kind == b'movi':
+            movi = (child, child_size)
+        elif fourcc == b'idx1':
+            flags = [struct.unpack_from('<4sIII', data, child + 8 + i * 16)[1] for i in range(child_size // 16)]
+    if hdrl is None or movi is None:
+        raise ValueError('AVI file without hdrl or movi list')
+    chunks = [(fourcc, chunk, chunk_size) for fourcc, kind, chunk, chunk_size
+              in riff_chunks(data, movi[0] + 12, movi[0] + 8 + movi[1]) if kind is None and fourcc != b'JUNK']
+    if len(flags) != len(chunks):
+        flags = [AVIIF_KEYFRAME if i == 0 else 0 for i in range(len(chunks))]
+    return hdrl, chunks, flags
+
+
+def patch_header(hdrl, frames, max_chunk):
+    # Frame counts and buffer sizes of the joined stream; an OpenDML super
+    # index would point into the first segment, so it is blanked
+    hdrl = bytearray(hdrl)
+    for fourcc, kind, offset, size in riff_chunks(hdrl, 12, len(hdrl)):
+        if kind is not None:
+            for child, _, child_offset, _ in riff_chunks(hdrl, offset + 12, offset + 8 + size):
+                if child == b'strh':
+                    struct.pack_into('<II', hdrl, child_offset + 8 + 32, frames, max_chunk)
+                elif child == b'indx':
+                    hdrl[child_offset:child_offset + 4] = b'JUNK'
+                elif child == b'dmlh':
+                    struct.pack_into('<I', hdrl, child_offset + 8, frames)
+        elif fourcc == b'avih':
+            struct.pack_into('<I', hdrl, offset + 8 + 16, frames)
+            struct.pack_into('<I', hdrl, offset + 8 + 28, max_chunk)
+    return bytes(hdrl)
+
+
+def concat_avi(paths, output):
+    # Joins AVI segments written with the same codec and size by copying
+    # their encoded frames into one movi list, without decoding. Each
+    # segment starts on a keyframe, so the stream stays decodable.
+    files = [open(path, 'rb') for path in paths]
+    try:
+        maps = [mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) for f in files]
+        layouts = [read_avi_layout(data) for data in maps]
+        frames = sum(len(chunks) for _, chunks, _ in layouts)
+        payload = sum(8 + size + (size & 1) for _, chunks, _ in layouts for _, _, size in chunks)
+        hdrl_offset, hdrl_size = layouts[0][0]
+        if hdrl_size + payload + 16 * frames + 64 > AVI_SIZE_LIMIT:
+            raise ValueError('Joined AVI would exceed the AVI 1.0 size limit')
+        max_chunk = max((size for _, chunks, _ in layouts for _, _, size in chunks), default=0)
+        hdrl = patch_header(maps[0][hdrl_offset:hdrl_offset + 8 + hdrl_size], frames, max_chunk)
+        index = []
+        with open(output, 'wb') as out:
+            out.write(b'RIFF\0\0\0\0AVI ')
+            out.write(hdrl)
+            movi_start = out.tell()
+            out.write(b'LIST\0\0\0\0movi')
+            for data, (_, chunks, flags) in zip(maps, layouts):
+                for (fourcc, offset, size), flag in zip(chunks, flags):
+                    # idx1 offsets count from the 'movi' fourcc
+                    index.append(struct.pack('<4sIII', fourcc, flag, out.tell() - movi_start - 8, size))
+                    out.write(data[offset:offset + 8 + size + (size & 1)])
+            movi_end = out.tell()
+            out.write(b'idx1' + struct.pack('<I', 16 * len(index)))
+            out.write(b''.join(index))
+            end = out.tell()
+            out.seek(movi_start + 4)
+            out.write(struct.pack('<I', movi_end - movi_start - 8))
+            out.seek(4)
+            out.write(struct.pack('<I', end - 8))
+        for data in maps:
+            data.close()
+    finally:
+        for f in files:
+            f.close()
+    return frames
+
+
+def concat_ffmpeg(paths, output):
+    # Stream copy through ffmpeg's concat demuxer
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+        for path in paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+        list_path = f.name
+    try:
+        subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                        '-i', list_path, '-c', 'copy', output], check=True)
+    finally:
+        os.remove(list_path)
+
+
+def concat_reencode(paths, output, fps, frame_size):
+    # Last resort: decode the segments in order into one writer
+    writer = cv2.VideoWriter(output, output_fourcc(output), fps, tuple(frame_size))
+    frames = 0
+    try:
+        for path in paths:
+            cap = cv2.VideoCapture(path)
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                writer.write(frame)
+                frames += 1
+            cap.release()
+    finally:
+        writer.release()
+    return frames
+
+
+def join_segments(paths, output, fps, frame_size):
+    # Returns how the segments were joined
+    if len(paths) == 1:
+        shutil.move(paths[0], output)
+        return 'single'
+    if output.endswith('.avi'):
+        try:
+            concat_avi(paths, output)
+            return 'copy'
+        except ValueError:
+            pass
+    elif shutil.which('ffmpeg'):
+        concat_ffmpeg(paths, output)
+        return 'ffmpeg'
+    concat_reencode(paths, output, fps, frame_size)
+    return 'reencode'
+
+
+def export_video(video, boxes, frame_size, output, initial_bbox=None, frames=None, fps=None,
+                 workers=None, accurate_seek=True):
+    # Renders the overlays over segments of the video on a process pool,
+    # then joins the segment files into output
+    workers = workers or os.cpu_count() or 1
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise IOError(f'Failed to open video {video}')
+    if fps is None:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if not fps or fps < 1:
+            fps = 30
+    if frames is None:
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    timestamps = None
+    if accurate_seek:
+        # Hashed and indexed once here; the workers only get the timestamps
+        index = FrameIndex(video)
+        index.load_or_build()
+        timestamps = index.timestamps
+    segments = split_segments(frames, workers)
+    extension = os.path.splitext(output)[1] or '.avi'
+    start_time = time.perf_counter()
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output))) as tmp:
+        paths = [os.path.join(tmp, f'segment_{i:04d}{extension}') for i in range(len(segments))]
+        with ProcessPoolExecutor(max_workers=min(workers, len(segments)), initializer=init_worker) as pool:
+            futures = [pool.submit(render_segment, video, path, start, end,
+                                   {name: rows[start:end] for name, rows in boxes.items()},
+                                   frame_size, fps, initial_bbox if start == 0 else None, timestamps)
+                       for path, (start, end) in zip(paths, segments)]
+            written = sum(future.result() for future in futures)
+        render_time = time.perf_counter() - start_time
+        method = join_segments(paths, output, fps, frame_size)
+    return {
+        'output': output,
+        'frames': written,
+        'segments': len(segments),
+        'render_s': render_time,
+        'join': method,
+        'wall_s': time.perf_counter() - start_time,
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Render an annotated result video from saved trajectories.')
+    parser.add_argument('results_dir', help='Directory written by headless_tracker.py --output-dir')
+    parser.add_argument('--video', help='Input video (default: the one named in report.json)')
+    parser.add_argument('-o', '--output', default='result.avi', help='Output video (.avi or .mp4)')
+    parser.add_argument('--trackers', nargs='+', default=None, help='Trackers to draw (default: all found)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--no-intro', action='store_true', help='Skip the one-second reference box intro')
+    parser.add_argument('--fast-seek', action='store_true',
+                        help='Seek segments by frame number alone instead of checking against the frame index; '
+                             'faster on a first export but may misplace boxes on long-GOP videos')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report, boxes = load_results(args.results_dir, args.trackers)
+    video = args.video or report['video']
+    frames = max([report.get('frames', 0)] + [len(rows) for rows in boxes.values()])
+    result = export_video(video, boxes, report['frame_size'], args.output,
+                          None if args.no_intro else report['initial_bbox'], frames,
+                          workers=args.workers, accurate_seek=not args.fast_seek)
+    print(f"{result['frames']} frames in {result['segments']} segments to {result['output']} "
+          f"in {result['wall_s']:.2f}s (render {result['render_s']:.2f}s, join: {result['join']})")
+
+
+if __name__ == '__main__':
+    main()
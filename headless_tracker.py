@@ -0,0 +1,282 @@
+import os
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from tracker_registry import TRACKER_TYPES, default_trackers
+from tracking import resize_frame, MultiTargetTracker
+from profiling import AllocationMeter, latency_summary
+from trajectory_cache import TrajectoryCache, TrajectoryRecorder, trajectory_key, video_hash
+from evaluation import gt_scale, load_ground_truth, score_trajectories
+from video_io import BufferPool
+
+
+def parse_bbox(text):
+    values = [float(v) for v in text.replace(',', ' ').split()]
+    if len(values) != 4:
+        raise ValueError(f'Expected x,y,w,h but got {text!r}')
+    return tuple(values)
+
+
+def read_bbox_file(path):
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                return parse_bbox(line)
+    raise ValueError(f'No bounding box found in {path}')
+
+
+def run_video(video_path, bbox, tracker_names=None, target_width=1280, target_height=720,
+              parallel=True, max_frames=None, timeout=None, tracking_width=None, crop_padding=None,
+              cache=None, reacquire_interval=5, trace_allocations=False):
+    tracker_names = list(tracker_names or default_trackers())
+    cache_keys, cached = {}, {}
+    if cache is not None:
+        params = {
+            'tracking_width': tracking_width,
+            'crop_padding': crop_padding,
+            'target_size': [target_width, target_height],
+            'reacquire_interval': reacquire_interval,
+        }
+        if reacquire_interval is not None:
+            # Re-acquisition follows the consensus of the other trackers on
+            # the target, so a trajectory depends on which ones ran with it
+            params['trackers'] = sorted(tracker_names)
+        content_hash = video_hash(video_path)
+        for name in tracker_names:
+            cache_keys[name] = trajectory_key(content_hash, 0, bbox, name, params)
+            trajectory = cache.load(cache_keys[name])
+            if trajectory is not None:
+                cached[name] = trajectory
+    live_names = [name for name in tracker_names if name not in cached]
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f'Failed to open video {video_path}')
+    decode_times, resize_times, reacquire_times = [], [], []
+    update_times = {name: [] for name in tracker_names}
+    trajectories = {name: [] for name in tracker_names}
+    if tracker_names and not live_names:
+        source_size = [int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))]
+        cap.release()
+        return cached_run(video_path, bbox, cached, parallel, source_size, target_width, target_height)
+    pool = ThreadPoolExecutor(max_workers=len(live_names)) if parallel else None
+    # Decoding and resizing reuse their buffers, so steady-state frames
+    # allocate next to nothing
+    buffers = BufferPool(8)
+    allocations = AllocationMeter()
+    if trace_allocations:
+        allocations.start()
+    try:
+        start = time.perf_counter()
+        ret, raw = cap.read()
+        decode_times.append(time.perf_counter() - start)
+        if not ret:
+            raise IOError(f'Failed to read video {video_path}')
+        source_size = [int(raw.shape[1]), int(raw.shape[0])]
+        start = time.perf_counter()
+        frame = resize_frame(raw, target_width, target_height, buffers)
+        resize_times.append(time.perf_counter() - start)
+        frame_size = [int(frame.shape[1]), int(frame.shape[0])]
+        targets = MultiTargetTracker(reacquire_interval)
+        target = targets.add_target(frame, bbox, live_names, tracking_width, crop_padding)
+        for name in live_names:
+            trajectories[name].append((0, True) + tuple(bbox))
+        frame_index = 0
+        timed_out = False
+        wall_start = time.perf_counter()
+        while max_frames is None or frame_index + 1 < max_frames:
+            if timeout is not None and time.perf_counter() - wall_start > timeout:
+                timed_out = True
+                break
+            if trace_allocations:
+                allocations.tick()
+            start = time.perf_counter()
+            ret, raw = cap.read(raw)
+            if not ret:
+                break
+            decode_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            frame = resize_frame(raw, target_width, target_height, buffers)
+            resize_times.append(time.perf_counter() - start)
+            frame_index += 1
+            for _, state, seconds in targets.update(frame, pool, frame_number=frame_index):
+                update_times[state.name].append(seconds)
+            reacquire_times.append(targets.reacquire_seconds)
+            for name, state in target.trackers.items():
+                box = state.bbox if state.success else (0.0, 0.0, 0.0, 0.0)
+                trajectories[name].append((frame_index, state.success) + tuple(box))
+        wall = time.perf_counter() - wall_start
+    finally:
+        allocations.stop()
+        if pool is not None:
+            pool.shutdown(wait=True)
+        cap.release()
+    for name, trajectory in cached.items():
+        trajectories[name] = cached_rows(trajectory)
+    # Only complete runs are cached; a partial trajectory can't be resumed
+    if cache is not None and not timed_out and max_frames is None:
+        for name in live_names:
+            cache.store(cache_keys[name], recorder_from_rows(trajectories[name], bbox),
+                        {'video': os.path.abspath(video_path), 'tracker': name})
+
+    report = {
+        'video': os.path.abspath(video_path),
+        'initial_bbox': list(bbox),
+        'source_size': source_size,
+        'frame_size': frame_size,
+        'frames': frame_index + 1,
+        'parallel': parallel,
+        'tracking_width': tracking_width,
+        'crop_padding': crop_padding,
+        'timed_out': timed_out,
+        'wall_s': wall,
+        'pipeline_fps': frame_index / wall if wall > 0 else 0.0,
+        'decode': latency_summary(decode_times),
+        'resize': latency_summary(resize_times),
+        'reacquire_interval': reacquire_interval,
+        'reacquire': latency_summary(reacquire_times),
+        'trackers': {},
+    }
+    if trace_allocations:
+        report['allocations'] = allocations.summary()
+    for name in tracker_names:
+        stats = latency_summary(update_times[name])
+        stats['fps'] = 1000.0 / stats['mean_ms'] if stats.get('mean_ms') else 0.0
+        stats['lost_frames'] = sum(1 for row in trajectories[name] if not row[1])
+        stats['cached'] = name in cached
+        if name in target.trackers:
+            state = target.trackers[name]
+            stats['lost'] = state.lost
+            stats['recovered'] = state.recovered
+            stats['suspended_frames'] = state.suspended_frames
+        report['trackers'][name] = stats
+    return trajectories, report
+
+
+def cached_rows(trajectory):
+    rows = []
+    for i in range(len(trajectory)):
+        replay = trajectory.get(trajectory.start_frame + i)
+        if replay is None:
+            break
+        success, box = replay
+        rows.append((i, success) + (tuple(box) if success else (0.0, 0.0, 0.0, 0.0)))
+    return rows
+
+
+def recorder_from_rows(rows, bbox):
+    recorder = TrajectoryRecorder(0, bbox)
+    for frame_index, success, x, y, w, h in rows[1:]:
+        recorder.record(frame_index, success, (x, y, w, h))
+    return recorder
+
+
+def cached_run(video_path, bbox, cached, parallel, source_size, target_width, target_height):
+    # Every requested tracker is cached, so the video isn't decoded at all
+    trajectories = {name: cached_rows(trajectory) for name, trajectory in cached.items()}
+    frames = max(len(rows) for rows in trajectories.values())
+    scale = min(target_width / source_size[0], target_height / source_size[1]) if source_size[0] else 1.0
+    report = {
+        'video': os.path.abspath(video_path),
+        'initial_bbox': list(bbox),
+        'source_size': source_size,
+        'frame_size': [int(source_size[0] * scale), int(source_size[1] * scale)],
+        'frames': frames,
+        'parallel': parallel,
+        'cached': True,
+        'timed_out': False,
+        'wall_s': 0.0,
+        'pipeline_fps': 0.0,
+        'decode': {'count': 0},
+        'resize': {'count': 0},
+        'trackers': {name: {'count': 0, 'fps': 0.0, 'cached': True,
+                            'lost_frames': sum(1 for row in rows if not row[1])}
+                     for name, rows in trajectories.items()},
+    }
+    return trajectories, report
+
+
+def write_trajectory(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['frame', 'success', 'x', 'y', 'w', 'h'])
+        for frame_index, success, x, y, w, h in rows:
+            writer.writerow([frame_index, int(success), x, y, w, h])
+
+
+def write_results(output_dir, trajectories, report):
+    os.makedirs(output_dir, exist_ok=True)
+    for name, rows in trajectories.items():
+        write_trajectory(os.path.join(output_dir, f'{name}_trajectory.csv'), rows)
+    with open(os.path.join(output_dir, 'report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Run OpenCV trackers over a video without a GUI.')
+    parser.add_argument('video', help='Input video file')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--bbox', type=parse_bbox, help='Initial box "x,y,w,h" in resized-frame coordinates')
+    group.add_argument('--bbox-file', help='Text file whose first line is "x,y,w,h"')
+    parser.add_argument('--trackers', nargs='+', choices=list(TRACKER_TYPES.keys()),
+                        default=default_trackers(), help='Trackers to run')
+    parser.add_argument('--output-dir', default='results', help='Directory for trajectories and report.json')
+    parser.add_argument('--width', type=int, default=1280, help='Target frame width')
+    parser.add_argument('--height', type=int, default=720, help='Target frame height')
+    parser.add_argument('--tracking-width', type=int, default=None,
+                        help='Downscale frames to this width for tracking only')
+    parser.add_argument('--crop-padding', type=float, default=None,
+                        help='Track on a crop padded by this many box sizes around the target')
+    parser.add_argument('--cache', action='store_true', help='Reuse and store trajectories in the trajectory cache')
+    parser.add_argument('--cache-dir', default=None, help='Trajectory cache directory (implies --cache)')
+    parser.add_argument('--reacquire-interval', type=int, default=5,
+                        help='Suspend lost trackers and try to re-acquire them every N frames (0 keeps updating them)')
+    parser.add_argument('--sequential', action='store_true', help='Update trackers one after another')
+    parser.add_argument('--max-frames', type=int, default=None, help='Stop after this many frames')
+    parser.add_argument('--ground-truth', help='Score against this ground truth (frame,x,y,w,h in source pixels)')
+    parser.add_argument('--trace-allocations', action='store_true',
+                        help='Record bytes allocated per frame with tracemalloc (slows the run down)')
+    return parser
+
+
+def cache_from_args(args):
+    if args.cache_dir:
+        return TrajectoryCache(args.cache_dir)
+    return TrajectoryCache() if args.cache else None
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    bbox = args.bbox if args.bbox is not None else read_bbox_file(args.bbox_file)
+    trajectories, report = run_video(args.video, bbox, args.trackers, args.width, args.height,
+                                     parallel=not args.sequential, max_frames=args.max_frames,
+                                     tracking_width=args.tracking_width, crop_padding=args.crop_padding,
+                                     cache=cache_from_args(args), reacquire_interval=args.reacquire_interval or None,
+                                     trace_allocations=args.trace_allocations)
+    if args.ground_truth:
+        scores = score_trajectories(trajectories, load_ground_truth(args.ground_truth), gt_scale(report))
+        for name, result in scores.items():
+            report['trackers'][name]['accuracy'] = result
+    write_results(args.output_dir, trajectories, report)
+    print(f"{report['frames']} frames in {report['wall_s']:.2f}s ({report['pipeline_fps']:.1f} fps)")
+    if report.get('allocations', {}).get('count'):
+        allocations = report['allocations']
+        print(f"allocated per frame: p50 {allocations['p50_kb']:.1f} KB  p95 {allocations['p95_kb']:.1f} KB  "
+              f"max {allocations['max_kb']:.1f} KB")
+    for name, stats in report['trackers'].items():
+        if stats['cached']:
+            print(f"{name:>10}: cached  lost {stats['lost_frames']}")
+            continue
+        print(f"{name:>10}: {stats['fps']:7.1f} fps  p50 {stats['p50_ms']:.2f} ms  "
+              f"p95 {stats['p95_ms']:.2f} ms  p99 {stats['p99_ms']:.2f} ms  lost {stats['lost_frames']}  "
+              f"lost/recovered {stats['lost']}/{stats['recovered']}")
+        if 'accuracy' in stats:
+            print(f"{'':>10}  AUC {stats['accuracy']['auc']:.3f}  P@20 {stats['accuracy']['precision_20']:.3f}  "
+                  f"IoU {stats['accuracy']['mean_iou']:.3f}")
+
+
+if __name__ == '__main__':
+    main()
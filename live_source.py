@@ -0,0 +1,233 @@
+import sys
+import time
+import argparse
+import threading
+import cv2
+import numpy as np
+from video_io import BufferPool
+
+
+class CaptureReader:
+    # Camera device or network stream through cv2.VideoCapture, asking the
+    # backend to buffer as little as it can
+    def __init__(self, source):
+        self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise IOError(f'Failed to open live source {source!r}')
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps >= 1 else None
+        self.pool = BufferPool(8)
+        self.shape = None
+
+    def read(self):
+        # Frames replaced before anyone read them go back to the pool
+        ret, frame = self.cap.read(self.pool.acquire(self.shape) if self.shape else None)
+        if ret:
+            self.shape = frame.shape
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class RawFrameReader:
+    # Packed BGR frames of a fixed size from a byte stream, e.g.
+    # ffmpeg -i ... -f rawvideo -pix_fmt bgr24 - | python live_tracker.py - --size WxH
+    def __init__(self, stream, width, height, fps=None):
+        self.stream = stream
+        self.shape = (height, width, 3)
+        self.frame_bytes = width * height * 3
+        self.fps = fps
+        self.pool = BufferPool(8)
+
+    def read(self):
+        frame = self.pool.acquire(self.shape)
+        view = memoryview(frame).cast('B')
+        filled = 0
+        while filled < self.frame_bytes:
+            n = self.stream.readinto(view[filled:])
+            if not n:
+                return False, None
+            filled += n
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class SyntheticFrames:
+    # Offline stand-in for a camera: a textured square circling over a noisy
+    # background, delivered in real time at fps. bbox(i) is the true box in
+    # frame i, so latency and accuracy can be checked without hardware.
+    def __init__(self, width=640, height=360, fps=30.0, frames=None, seed=0):
+        rng = np.random.default_rng(seed)
+        self.width, self.height = width, height
+        self.fps = fps
+        self.frames = frames
+        self.size = max(16, min(width, height) // 6)
+        self.texture = cv2.GaussianBlur(rng.integers(0, 256, (self.size, self.size, 3), dtype=np.uint8), (5, 5), 0)
+        self.background = cv2.GaussianBlur(rng.integers(40, 140, (height, width, 3), dtype=np.uint8), (15, 15), 0)
+        self.index = 0
+        self.start = None
+        self.pool = BufferPool(8)
+
+    def bbox(self, i):
+        t = i / self.fps
+        cx = self.width / 2 + (self.width / 2 - self.size) * 0.8 * np.cos(t * 0.7)
+        cy = self.height / 2 + (self.height / 2 - self.size) * 0.8 * np.sin(t * 1.1)
+        return (int(cx - self.size / 2), int(cy - self.size / 2), self.size, self.size)
+
+    def read(self):
+        if self.frames is not None and self.index >= self.frames:
+            return False, None
+        if self.start is None:
+            self.start = time.perf_counter()
+        delay = self.start + self.index / self.fps - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        x, y, w, h = self.bbox(self.index)
+        frame = self.pool.acquire(self.background.shape)
+        np.copyto(frame, self.background)
+        frame[y:y + h, x:x + w] = self.texture
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        self.frames = self.index
+
+
+def parse_size(text):
+    width, height = (int(v) for v in text.lower().split('x'))
+    return width, height
+
+
+def open_live_source(spec, size=None, fps=None):
+    # spec is a device index ("0"), a URL or path, "-" for raw BGR frames on
+    # stdin (size required), or "synthetic"
+    if spec == '-':
+        if size is None:
+            raise ValueError('Raw frames on stdin need a frame size')
+        return RawFrameReader(sys.stdin.buffer, size[0], size[1], fps)
+    if spec == 'synthetic':
+        width, height = size or (640, 360)
+        return SyntheticFrames(width, height, fps or 30.0)
+    return CaptureReader(int(spec) if spec.isdigit() else spec)
+
+
+class LatestFrameGrabber:
+    # Reads a live source on a background thread and keeps only the newest
+    # frame. A frame replaced before it was read is dropped, so a slow
+    # consumer always gets the current frame instead of working through a
+    # backlog. Items match FramePrefetcher's, (sequence number + 1, frame);
+    # capture_time is when the frame last returned by read() came off the
+    # source, for glass-to-box latency.
+    def __init__(self, reader, transform=None, profiler=None, clock=time.perf_counter):
+        self.reader = reader
+        self.transform = transform
+        self.profiler = profiler
+        self.clock = clock
+        self._latest = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self.grabbed = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.capture_time = None
+        self.source_size = None
+        self.eof = False
+
+    def __len__(self):
+        # 1 while a frame newer than the last one read is waiting
+        with self._cond:
+            return int(self._latest is not None)
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None or self.eof:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='LatestFrameGrabber', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            ret, frame = self.reader.read()
+            captured = self.clock()
+            with self._cond:
+                if not ret:
+                    self.eof = True
+                    self._cond.notify_all()
+                    return
+                if self._latest is not None:
+                    self.dropped += 1
+                self.grabbed += 1
+                self.source_size = (frame.shape[1], frame.shape[0])
+                self._latest = (self.grabbed, frame, captured)
+                self._cond.notify_all()
+
+    def read(self, timeout=None):
+        # Returns (True, (sequence, frame)) for a frame not returned before,
+        # or (False, None) on timeout or once the source has ended
+        with self._cond:
+            while self._latest is None and not self.eof and self._thread is not None:
+                if not self._cond.wait(timeout):
+                    break
+            if self._latest is None:
+                return False, None
+            sequence, frame, self.capture_time = self._latest
+            self._latest = None
+            self.delivered += 1
+        if self.transform is not None:
+            start = time.perf_counter()
+            frame = self.transform(frame)
+            if self.profiler is not None:
+                self.profiler.add('resize', time.perf_counter() - start)
+        return True, (sequence, frame)
+
+    def latency(self):
+        # Seconds since the frame last returned by read() was captured
+        return self.clock() - self.capture_time if self.capture_time is not None else None
+
+    def stop(self, timeout=1.0):
+        # A source blocked in read() can't be interrupted; the thread is a
+        # daemon, so it is left behind after timeout
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def write_synthetic(stream, width, height, fps, frames):
+    # Raw BGR frames on stdout, to test the stdin source through a pipe
+    source = SyntheticFrames(width, height, fps, frames)
+    while True:
+        ret, frame = source.read()
+        if not ret:
+            break
+        stream.write(frame.tobytes())
+        stream.flush()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Write synthetic raw BGR frames to stdout.')
+    parser.add_argument('--size', type=parse_size, default=(640, 360), help='Frame size WxH')
+    parser.add_argument('--fps', type=float, default=30.0, help='Frames per second')
+    parser.add_argument('--frames', type=int, default=300, help='Number of frames')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        write_synthetic(sys.stdout.buffer, args.size[0], args.size[1], args.fps, args.frames)
+    except BrokenPipeError:
+        pass
+
+
+if __name__ == '__main__':
+    main()
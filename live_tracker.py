@@ -0,0 +1,128 @@
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from tracker_registry import TRACKER_TYPES, default_trackers
+from tracking import resize_frame, MultiTargetTracker
+from profiling import latency_summary
+from live_source import LatestFrameGrabber, SyntheticFrames, open_live_source, parse_size
+from headless_tracker import parse_bbox
+from evaluation import evaluate, history_boxes
+
+
+def run_live(reader, bbox=None, tracker_names=None, target_width=1280, target_height=720, parallel=True,
+             duration=None, max_frames=None, reacquire_interval=5):
+    # Tracks the newest frame of a live source until it ends, duration
+    # seconds pass or max_frames frames are processed. bbox is in
+    # resized-frame pixels; a synthetic source supplies its own if omitted.
+    tracker_names = list(tracker_names or default_trackers())
+    grabber = LatestFrameGrabber(reader, lambda frame: resize_frame(frame, target_width, target_height))
+    pool = ThreadPoolExecutor(max_workers=len(tracker_names)) if parallel else None
+    latencies = []
+    update_times = {name: [] for name in tracker_names}
+    targets = MultiTargetTracker(reacquire_interval)
+    target = None
+    scale = 1.0
+    grabber.start()
+    try:
+        ret, item = grabber.read(timeout=10.0)
+        if not ret:
+            raise IOError('No frames from live source')
+        sequence, frame = item
+        scale = frame.shape[1] / grabber.source_size[0]
+        if bbox is None:
+            if not isinstance(reader, SyntheticFrames):
+                raise ValueError('An initial box is required for this source')
+            bbox = tuple(v * scale for v in reader.bbox(sequence - 1))
+        target = targets.add_target(frame, bbox, tracker_names)
+        for state in target.trackers.values():
+            state.history[sequence - 1] = tuple(bbox)
+        processed = 1
+        start = time.perf_counter()
+        while max_frames is None or processed < max_frames:
+            if duration is not None and time.perf_counter() - start > duration:
+                break
+            ret, item = grabber.read(timeout=1.0)
+            if not ret:
+                if grabber.eof:
+                    break
+                continue
+            sequence, frame = item
+            for _, state, seconds in targets.update(frame, pool, frame_number=sequence - 1):
+                update_times[state.name].append(seconds)
+            latencies.append(grabber.latency())
+            processed += 1
+        wall = time.perf_counter() - start
+    finally:
+        grabber.stop()
+        reader.release()
+        if pool is not None:
+            pool.shutdown(wait=True)
+    report = {
+        'initial_bbox': list(bbox),
+        'frame_size': [int(frame.shape[1]), int(frame.shape[0])],
+        'grabbed': grabber.grabbed,
+        'processed': processed,
+        'dropped': grabber.dropped,
+        'wall_s': wall,
+        'processed_fps': (processed - 1) / wall if wall > 0 else 0.0,
+        'source_fps': getattr(reader, 'fps', None),
+        'glass_to_box': latency_summary(latencies),
+        'trackers': {},
+    }
+    for name, state in target.trackers.items():
+        stats = latency_summary(update_times[name])
+        stats['lost'] = state.lost
+        stats['recovered'] = state.recovered
+        if isinstance(reader, SyntheticFrames):
+            # The synthetic source knows where its object was; dropped frames
+            # were never tracked, so only processed ones are scored
+            nan = (float('nan'),) * 4
+            truth = [reader.bbox(i) if i in state.history else nan for i in range(grabber.grabbed)]
+            result = evaluate(history_boxes(state.history), truth, scale)
+            stats['accuracy'] = {key: result[key] for key in ('frames', 'mean_iou', 'auc', 'precision_20')}
+        report['trackers'][name] = stats
+    return report
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Track on a live source, always using the newest frame.')
+    parser.add_argument('source', help='Device index, stream URL, "-" for raw BGR frames on stdin, or "synthetic"')
+    parser.add_argument('--bbox', type=parse_bbox, default=None,
+                        help='Initial box "x,y,w,h" in resized-frame coordinates (optional for synthetic)')
+    parser.add_argument('--size', type=parse_size, default=None, help='Frame size WxH of raw stdin/synthetic frames')
+    parser.add_argument('--fps', type=float, default=None, help='Frame rate of raw stdin/synthetic frames')
+    parser.add_argument('--trackers', nargs='+', choices=list(TRACKER_TYPES.keys()),
+                        default=default_trackers(), help='Trackers to run')
+    parser.add_argument('--width', type=int, default=1280, help='Target frame width')
+    parser.add_argument('--height', type=int, default=720, help='Target frame height')
+    parser.add_argument('--duration', type=float, default=None, help='Stop after this many seconds')
+    parser.add_argument('--max-frames', type=int, default=None, help='Stop after processing this many frames')
+    parser.add_argument('--sequential', action='store_true', help='Update trackers one after another')
+    parser.add_argument('--output', help='Write the report as JSON')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    reader = open_live_source(args.source, args.size, args.fps)
+    report = run_live(reader, args.bbox, args.trackers, args.width, args.height, parallel=not args.sequential,
+                      duration=args.duration, max_frames=args.max_frames)
+    latency = report['glass_to_box']
+    print(f"{report['processed']} of {report['grabbed']} frames processed ({report['dropped']} dropped), "
+          f"{report['processed_fps']:.1f} fps")
+    if latency['count']:
+        print(f"glass-to-box p50 {latency['p50_ms']:.1f} ms  p95 {latency['p95_ms']:.1f} ms  "
+              f"p99 {latency['p99_ms']:.1f} ms  max {latency['max_ms']:.1f} ms")
+    for name, stats in report['trackers'].items():
+        line = f"{name:>10}: lost/recovered {stats['lost']}/{stats['recovered']}"
+        if 'accuracy' in stats:
+            line += f"  AUC {stats['accuracy']['auc']:.3f}  IoU {stats['accuracy']['mean_iou']:.3f}"
+        print(line)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import cv2
+from tracker_registry import TRACKER_COLORS
+
+# Drawing for saved result videos; kept free of Qt so worker processes can
+# render without a display stack
+
+
+def draw_box(frame, bbox, color, label):
+    x, y, w, h = [int(v) for v in bbox]
+    cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+    cv2.putText(frame, label, (x, y - 10),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+
+
+def draw_reference(frame, bbox):
+    x, y, w, h = [int(v) for v in bbox]
+    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 255), 2)
+    cv2.putText(frame, 'Reference', (x, y + h + 25),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+
+
+def draw_reference_intro(frame, bbox):
+    # The frame held for a second at the start of a saved video
+    x, y, w, h = [int(v) for v in bbox]
+    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 255), 3)
+    cv2.putText(frame, 'Reference Box Selected', (x, y - 20),
+                cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 3, cv2.LINE_AA)
+
+
+def draw_legend(frame, names):
+    box_w, box_h = 22, 22
+    font_scale = 0.7
+    thickness = 2
+    x0 = frame.shape[1] - 180
+    y0 = 20
+    for i, name in enumerate(names):
+        color = TRACKER_COLORS[name]
+        y = y0 + i * (box_h + 8)
+        cv2.rectangle(frame, (x0, y), (x0 + box_w, y + box_h), color, -1)
+        cv2.rectangle(frame, (x0, y), (x0 + box_w, y + box_h), (255,255,255), 1)
+        cv2.putText(frame, name, (x0 + box_w + 8, y + box_h - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255,255,255), thickness)
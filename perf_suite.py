@@ -0,0 +1,404 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from functools import partial
+import cv2
+import numpy as np
+from tracker_registry import TRACKER_TYPES, TRACKER_COLORS
+from tracking import resize_frame, MultiTargetTracker
+from overlays import draw_box, draw_legend
+from evaluation import evaluate, history_boxes
+from profiling import Profiler
+from video_io import AsyncVideoWriter, BufferPool, FramePrefetcher
+
+SCENARIOS = ('textured', 'occlusion', 'scale', 'fast')
+RESOLUTIONS = ((640, 360), (1280, 720), (1920, 1080))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'perf_baseline.json')
+
+# Settings that change the measured work; a baseline only applies if they match
+SETTINGS = ('frames', 'seed', 'target_size', 'threads', 'repeats')
+
+# The scale clip is tracked on a 640-wide copy cropped around the box, so
+# the ScaledTracker path is timed as well
+TRACKING_OPTIONS = {'scale': {'tracking_width': 640, 'crop_padding': 1.5}}
+
+
+class SyntheticSequence:
+    # Deterministic test clip: a textured square over a noisy background.
+    # 'textured' drifts slowly, 'occlusion' passes a bar over it halfway
+    # through, 'scale' grows and shrinks it and 'fast' moves it over half a
+    # box size per frame with jitter. Positions scale with the resolution so
+    # every size sees the same motion.
+    def __init__(self, scenario, width, height, frames=40, seed=0):
+        if scenario not in SCENARIOS:
+            raise ValueError(f'Unknown scenario {scenario!r}')
+        rng = np.random.default_rng(seed)
+        self.scenario = scenario
+        self.width, self.height = width, height
+        self.frames = frames
+        self.size = max(16, min(width, height) // 6)
+        self.texture = cv2.GaussianBlur(rng.integers(0, 256, (self.size * 2, self.size * 2, 3), dtype=np.uint8),
+                                        (5, 5), 0)
+        self.background = cv2.GaussianBlur(rng.integers(40, 140, (height, width, 3), dtype=np.uint8), (15, 15), 0)
+        self.occluder = cv2.GaussianBlur(rng.integers(60, 120, (height, self.size * 2, 3), dtype=np.uint8),
+                                         (9, 9), 0)
+        self.jitter = rng.normal(0.0, 0.15, (frames, 2))
+
+    def bbox(self, i):
+        t = i / max(1, self.frames - 1)
+        size = self.size
+        if self.scenario == 'scale':
+            size = int(self.size * (1.0 + 0.5 * np.sin(t * 2 * np.pi)))
+        if self.scenario == 'fast':
+            cx = self.width / 2 + (self.width / 2 - size) * 0.8 * np.cos(t * 2 * np.pi)
+            cy = self.height / 2 + (self.height / 2 - size) * 0.8 * np.sin(t * 4 * np.pi)
+            cx += self.jitter[i, 0] * size
+            cy += self.jitter[i, 1] * size
+        else:
+            cx = self.width * (0.3 + 0.4 * t)
+            cy = self.height * (0.5 + 0.15 * np.sin(t * 2 * np.pi))
+        x = int(np.clip(cx - size / 2, 0, self.width - size))
+        y = int(np.clip(cy - size / 2, 0, self.height - size))
+        return (x, y, size, size)
+
+    def frame(self, i):
+        x, y, w, h = self.bbox(i)
+        frame = self.background.copy()
+        texture = cv2.resize(self.texture, (w, h)) if self.scenario == 'scale' else self.texture[:h, :w]
+        frame[y:y + h, x:x + w] = texture
+        if self.scenario == 'occlusion':
+            # The bar sweeps right and covers the object around mid-clip
+            t = i / max(1, self.frames - 1)
+            cx = self.width * (0.3 + 0.4 * 0.5) + (t - 0.5) * self.width * 1.5
+            x0 = int(cx - self.occluder.shape[1] / 2)
+            x1 = x0 + self.occluder.shape[1]
+            left, right = max(0, x0), min(self.width, x1)
+            if right > left:
+                frame[:, left:right] = self.occluder[:, left - x0:right - x0]
+        return frame
+
+
+def cpu_name():
+    # platform.processor() is empty on most Linux systems
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def calibrate(repeats=30):
+    # Fastest time of a fixed NumPy workload, so a baseline recorded on one
+    # machine can be scaled to another of different speed. The minimum is
+    # far steadier than the median on a busy machine.
+    data = np.random.default_rng(0).random(1 << 20)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        np.sort(data)
+        samples.append(time.perf_counter() - start)
+    return float(min(samples) * 1000.0)
+
+
+def write_clip(sequence, path):
+    # Generating the clip isn't timed; the suite decodes it like a real video
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (sequence.width, sequence.height))
+    for i in range(sequence.frames):
+        writer.write(sequence.frame(i))
+    writer.release()
+
+
+def decode_clip(path, transform, frames, profiler=None):
+    # Decodes the whole clip through a FramePrefetcher before anything else runs
+    cap = cv2.VideoCapture(path)
+    prefetcher = FramePrefetcher(cap, transform, frames, profiler)
+    decoded = []
+    try:
+        prefetcher.start()
+        while not prefetcher.eof and len(prefetcher) < frames:
+            time.sleep(0.001)
+        while True:
+            ok, item = prefetcher.read()
+            if not ok:
+                break
+            decoded.append(item[1])
+    finally:
+        prefetcher.stop()
+        cap.release()
+    return decoded
+
+
+def run_sequence(sequence, tracker_names, target_size, output_dir):
+    # Plays one clip through the same pipeline as the GUI and the headless
+    # runner: FramePrefetcher (decode, resize) -> MultiTargetTracker (update,
+    # each tracker, reacquire) -> draw -> AsyncVideoWriter (encode). The
+    # stages run one after another rather than overlapped so the decode and
+    # encode threads don't compete with the trackers for the CPU.
+    clip = f'{sequence.scenario}_{sequence.width}x{sequence.height}'
+    source = os.path.join(output_dir, f'{clip}_source.avi')
+    write_clip(sequence, source)
+    profiler = Profiler()
+    pool = BufferPool(2 * sequence.frames + 8)
+    width, height = target_size
+    transform = partial(resize_frame, target_width=width, target_height=height, pool=pool)
+    # An untimed first pass fills the pool with a resized and an annotated
+    # buffer per frame, so the timed pass reuses buffers like steady-state
+    # playback instead of faulting in fresh memory
+    warm = decode_clip(source, transform, sequence.frames)
+    copies = [pool.acquire(frame.shape) for frame in warm]
+    for copy, frame in zip(copies, warm):
+        copy[:] = frame
+    del warm, copies
+    frames = decode_clip(source, transform, sequence.frames, profiler)
+    scale = frames[0].shape[1] / sequence.width
+    targets = MultiTargetTracker()
+    target = targets.add_target(frames[0], tuple(v * scale for v in sequence.bbox(0)), tracker_names,
+                                **TRACKING_OPTIONS.get(sequence.scenario, {}))
+    for state in target.trackers.values():
+        state.history[0] = state.bbox
+    annotated = []
+    for frame_number, frame in enumerate(frames[1:], 1):
+        start = time.perf_counter()
+        results = targets.update(frame, frame_number=frame_number)
+        profiler.add('update', time.perf_counter() - start)
+        for _, state, seconds in results:
+            profiler.add(state.name, seconds)
+        profiler.add('reacquire', targets.reacquire_seconds)
+        with profiler.measure('draw'):
+            out_frame = pool.acquire(frame.shape)
+            out_frame[:] = frame
+            for name, state in target.trackers.items():
+                if state.success:
+                    draw_box(out_frame, state.bbox, TRACKER_COLORS[name], name)
+            draw_legend(out_frame, tracker_names)
+        annotated.append(out_frame)
+    writer = AsyncVideoWriter(os.path.join(output_dir, f'{clip}.avi'), cv2.VideoWriter_fourcc(*'XVID'), 30,
+                              (frames[0].shape[1], frames[0].shape[0]), len(annotated) + 1, profiler=profiler)
+    for out_frame in annotated:
+        writer.write(out_frame)
+    writer.release()
+    truth = [sequence.bbox(i) for i in range(sequence.frames)]
+    accuracy = {name: evaluate(history_boxes(state.history), truth, scale)['auc']
+                for name, state in target.trackers.items()}
+    return profiler.summary(), accuracy
+
+
+def measure(results, scenario, width, height, output_dir, log=print):
+    # Runs one clip and records its stage medians. Every run's median is
+    # kept; a stage is judged by the fastest of them, and their spread on
+    # the baseline tells how noisy the stage is.
+    settings = results['settings']
+    key = f'{scenario}/{width}x{height}'
+    sequence = SyntheticSequence(scenario, width, height, settings['frames'], settings['seed'])
+    summary, accuracy = run_sequence(sequence, results['trackers'], settings['target_size'], output_dir)
+    for stage, stats in summary.items():
+        entry = results['stages'].setdefault(f'{key}/{stage}', {'runs_ms': []})
+        entry['runs_ms'].append(stats['p50_ms'])
+        entry['count'] = stats['count']
+        entry['median_ms'] = min(entry['runs_ms'])
+        entry['spread'] = max(entry['runs_ms']) / entry['median_ms'] - 1.0 if entry['median_ms'] > 0 else 0.0
+    for name, auc in accuracy.items():
+        results['accuracy'][f'{key}/{name}'] = auc
+    if key not in results['clips']:
+        results['clips'].append(key)
+    if log is not None:
+        log(f'{key:<22} ' + '  '.join(f"{stage} {stats['p50_ms']:.2f}" for stage, stats in summary.items()))
+
+
+def run_suite(scenarios=SCENARIOS, resolutions=RESOLUTIONS, tracker_names=None, frames=40, seed=0,
+              target_size=(1280, 720), threads=1, repeats=2, log=print):
+    cv2.setNumThreads(threads)
+    results = {
+        'meta': {
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'processor': cpu_name(),
+            'cpu_count': os.cpu_count(),
+            'calibration_ms': calibrate(),
+        },
+        'settings': {'frames': frames, 'seed': seed, 'target_size': list(target_size), 'threads': threads,
+                     'repeats': repeats},
+        'trackers': list(tracker_names or TRACKER_TYPES),
+        'selected_trackers': list(tracker_names) if tracker_names else None,
+        'clips': [],
+        'stages': {},
+        'accuracy': {},
+    }
+    with tempfile.TemporaryDirectory() as output_dir:
+        for _ in range(repeats):
+            for scenario in scenarios:
+                for width, height in resolutions:
+                    measure(results, scenario, width, height, output_dir, log)
+    # Calibrated again at the end in case the machine was busy at the start
+    results['meta']['calibration_ms'] = min(results['meta']['calibration_ms'], calibrate())
+    return results
+
+
+def remeasure(results, clips, log=print):
+    # clips are "scenario/WxH" keys, e.g. the ones with a slow stage. The
+    # machine is calibrated again since its speed may have changed.
+    calibration = calibrate()
+    with tempfile.TemporaryDirectory() as output_dir:
+        for clip in clips:
+            scenario, size = clip.split('/')
+            width, height = (int(v) for v in size.split('x'))
+            measure(results, scenario, width, height, output_dir, log)
+    results['meta']['calibration_ms'] = min(calibration, calibrate())
+
+
+def slow_clips(rows):
+    # Missing stages are left out: measuring again won't produce them
+    return sorted({'/'.join(key.split('/')[:2]) for key, _, _, current, ok in rows
+                   if not ok and not key.endswith(' AUC') and not np.isnan(current)})
+
+
+def same_machine(results, baseline):
+    return all(results['meta'].get(key) == baseline['meta'].get(key) for key in ('machine', 'processor', 'cpu_count'))
+
+
+def compare(results, baseline, tolerance=0.3, min_ms=0.2, accuracy_tolerance=0.05, calibrate_speed=True):
+    # Rows of (metric, baseline, allowed, current, ok). A stage fails when its
+    # median exceeds the baseline, scaled by the machine-speed ratio, by more
+    # than tolerance and min_ms together; min_ms keeps sub-millisecond
+    # stages from failing on timer noise, and a stage whose runs varied on
+    # the baseline gets that spread (up to tolerance again) on top. Accuracy
+    # fails on an AUC drop. Every baseline metric of a clip that was run must
+    # be present, except for trackers left out with --trackers; with the
+    # default of every available tracker, one missing from this build fails.
+    speed = 1.0
+    if calibrate_speed and baseline['meta'].get('calibration_ms'):
+        speed = results['meta']['calibration_ms'] / baseline['meta']['calibration_ms']
+        # The calibration is noisier than the stages themselves, so on the
+        # hardware the baseline was recorded on it only loosens the check,
+        # when the machine is running slower than it did then
+        if same_machine(results, baseline):
+            speed = max(1.0, speed)
+    clips = set(results['clips'])
+    skipped = set()
+    if results.get('selected_trackers') is not None:
+        skipped = set(baseline.get('trackers', [])) - set(results['selected_trackers'])
+
+    def checked(key):
+        parts = key.split('/')
+        return '/'.join(parts[:2]) in clips and parts[2] not in skipped
+
+    rows = []
+    for key, expected in baseline['stages'].items():
+        if not checked(key):
+            continue
+        noise = min(expected.get('spread', 0.0), tolerance)
+        allowed = expected['median_ms'] * speed * (1.0 + tolerance + noise) + min_ms
+        current = results['stages'].get(key)
+        current_ms = current['median_ms'] if current is not None else np.nan
+        rows.append((key, expected['median_ms'] * speed, allowed, current_ms, current_ms <= allowed))
+    for key, expected in baseline['accuracy'].items():
+        if not checked(key):
+            continue
+        allowed = expected - accuracy_tolerance
+        current = results['accuracy'].get(key, np.nan)
+        rows.append((f'{key} AUC', expected, allowed, current, current >= allowed))
+    return rows, speed
+
+
+def settings_mismatch(results, baseline):
+    return [name for name in SETTINGS if results['settings'].get(name) != baseline.get('settings', {}).get(name)]
+
+
+def print_report(rows, speed, verbose=False):
+    failures = [row for row in rows if not row[4]]
+    print(f'Machine speed relative to baseline: {1.0 / speed:.2f}x')
+    print(f"{'metric':<44} {'baseline':>9} {'allowed':>9} {'current':>9}")
+    for key, expected, allowed, current, ok in rows:
+        if verbose or not ok:
+            status = 'ok' if ok else 'MISSING' if np.isnan(current) else 'REGRESSION'
+            print(f"{key:<44} {expected:9.3f} {allowed:9.3f} {current:9.3f}  {status}")
+    if failures:
+        print(f'FAILED: {len(failures)} of {len(rows)} checks regressed')
+    else:
+        print(f'OK: {len(rows)} checks within tolerance')
+    return not failures
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Time the tracking pipeline on synthetic clips and compare '
+                                                 'against a stored baseline.')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline JSON to compare against')
+    parser.add_argument('--update-baseline', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS),
+                        help='Synthetic scenarios to run')
+    parser.add_argument('--resolutions', nargs='+', default=[f'{w}x{h}' for w, h in RESOLUTIONS],
+                        help='Source resolutions WxH to generate')
+    parser.add_argument('--trackers', nargs='+', choices=list(TRACKER_TYPES.keys()), default=None,
+                        help='Trackers to time (default: every available tracker)')
+    parser.add_argument('--frames', type=int, default=40, help='Frames per clip')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the clips')
+    parser.add_argument('--width', type=int, default=1280, help='Target frame width')
+    parser.add_argument('--height', type=int, default=720, help='Target frame height')
+    parser.add_argument('--threads', type=int, default=1, help='OpenCV threads (1 gives the steadiest timings)')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='Allowed slowdown as a fraction of the baseline')
+    parser.add_argument('--min-ms', type=float, default=0.2, help='Allowed slowdown in ms on top of --tolerance')
+    parser.add_argument('--accuracy-tolerance', type=float, default=0.05, help='Allowed AUC drop')
+    parser.add_argument('--no-calibration', action='store_true',
+                        help='Compare raw times instead of scaling the baseline to this machine')
+    parser.add_argument('--repeats', type=int, default=2,
+                        help='Measure every clip this many times and keep the fastest; must match the baseline')
+    parser.add_argument('--retries', type=int, default=2,
+                        help='Measure clips with a slow stage again before reporting a regression')
+    parser.add_argument('--output', help='Write the results as JSON')
+    parser.add_argument('--verbose', action='store_true', help='List every check, not only regressions')
+    return parser
+
+
+def write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    resolutions = [tuple(int(v) for v in text.lower().split('x')) for text in args.resolutions]
+    results = run_suite(args.scenarios, resolutions, args.trackers, args.frames, args.seed,
+                        (args.width, args.height), args.threads, args.repeats)
+    if args.output:
+        write_json(args.output, results)
+    if args.update_baseline:
+        write_json(args.baseline, results)
+        print(f'Baseline written to {args.baseline}')
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}; run with --update-baseline first')
+        return 2
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    mismatch = settings_mismatch(results, baseline)
+    if mismatch:
+        print(f"Settings differ from the baseline ({', '.join(mismatch)}); results are not comparable")
+        return 2
+    rows, speed = compare(results, baseline, args.tolerance, args.min_ms, args.accuracy_tolerance,
+                          not args.no_calibration)
+    for _ in range(args.retries):
+        # A busy moment on the machine can slow a single clip; a real
+        # regression stays slow when measured again
+        clips = slow_clips(rows)
+        if not clips:
+            break
+        print(f'Measuring {len(clips)} clips with slow stages again')
+        remeasure(results, clips)
+        rows, speed = compare(results, baseline, args.tolerance, args.min_ms, args.accuracy_tolerance,
+                              not args.no_calibration)
+        if args.output:
+            write_json(args.output, results)
+    return 0 if print_report(rows, speed, args.verbose) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import csv
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager
+import numpy as np
+
+# All-time histogram bins in milliseconds, log-spaced from 10 us to 10 s
+HISTOGRAM_EDGES_MS = np.geomspace(0.01, 10000.0, 61)
+
+
+def latency_summary(samples):
+    if len(samples) == 0:
+        return {'count': 0}
+    ms = np.asarray(samples) * 1000.0
+    return {
+        'count': len(samples),
+        'total_s': float(ms.sum() / 1000.0),
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'max_ms': float(ms.max()),
+    }
+
+
+class AllocationMeter:
+    # Bytes allocated through Python and NumPy between ticks, from the
+    # tracemalloc peak above the level at the previous tick, so a full frame
+    # allocated and freed within one frame still counts. Tracing slows every
+    # allocation down, so it only runs while a meter is started.
+    def __init__(self):
+        self.samples = []
+        self.level = None
+        self.owns_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.owns_tracing = True
+        self.samples = []
+        self.level = None
+
+    def stop(self):
+        if self.owns_tracing:
+            tracemalloc.stop()
+            self.owns_tracing = False
+        self.level = None
+
+    @property
+    def running(self):
+        return tracemalloc.is_tracing()
+
+    def tick(self):
+        current, peak = tracemalloc.get_traced_memory()
+        if self.level is not None:
+            self.samples.append(max(0, peak - self.level))
+        tracemalloc.reset_peak()
+        self.level = current
+
+    def summary(self, window=None):
+        samples = self.samples[-window:] if window else self.samples
+        if not samples:
+            return {'count': 0}
+        kb = np.asarray(samples) / 1024.0
+        return {
+            'count': len(samples),
+            'mean_kb': float(kb.mean()),
+            'p50_kb': float(np.percentile(kb, 50)),
+            'p95_kb': float(np.percentile(kb, 95)),
+            'p99_kb': float(np.percentile(kb, 99)),
+            'max_kb': float(kb.max()),
+        }
+
+
+class RollingStats:
+    # Percentiles over the last `window` samples plus an all-time histogram
+    def __init__(self, window=300):
+        self.window = window
+        self.samples = np.zeros(window)
+        self.count = 0
+        self.total = 0.0
+        self.histogram = np.zeros(len(HISTOGRAM_EDGES_MS) + 1, dtype=np.int64)
+
+    def add(self, seconds):
+        self.samples[self.count % self.window] = seconds
+        self.count += 1
+        self.total += seconds
+        self.histogram[np.searchsorted(HISTOGRAM_EDGES_MS, seconds * 1000.0)] += 1
+
+    def recent(self):
+        return self.samples[:min(self.count, self.window)]
+
+    def summary(self):
+        stats = latency_summary(self.recent())
+        stats['count'] = self.count
+        stats['total_s'] = self.total
+        stats['all_time_mean_ms'] = self.total * 1000.0 / self.count if self.count else 0.0
+        return stats
+
+
+class Profiler:
+    # Named timing series; safe to feed from worker threads
+    def __init__(self, window=300):
+        self.window = window
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self.lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = RollingStats(self.window)
+            stats.add(seconds)
+
+    @contextmanager
+    def measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+
+    def summary(self):
+        with self.lock:
+            return {name: stats.summary() for name, stats in self.stats.items()}
+
+    def export_json(self, path):
+        with self.lock:
+            data = {
+                'histogram_edges_ms': HISTOGRAM_EDGES_MS.tolist(),
+                'stages': {name: dict(stats.summary(), histogram=stats.histogram.tolist())
+                           for name, stats in self.stats.items()},
+            }
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    def export_csv(self, path):
+        fields = ['stage', 'count', 'total_s', 'all_time_mean_ms', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+            for name, stats in self.summary().items():
+                writer.writerow(dict(stats, stage=name))
+
+    def export(self, path):
+        if path.endswith('.csv'):
+            self.export_csv(path)
+        else:
+            self.export_json(path)
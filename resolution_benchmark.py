@@ -0,0 +1,68 @@
+import json
+import argparse
+from tracker_registry import TRACKER_TYPES, default_trackers
+from evaluation import evaluate, gt_scale, load_ground_truth, trajectory_boxes
+from headless_tracker import parse_bbox, read_bbox_file, run_video
+
+
+def compare(boxes, reference):
+    result = evaluate(boxes, reference)
+    return {key: result[key] for key in ('mean_iou', 'success_50', 'auc', 'precision_20')}
+
+
+def run_benchmark(video, bbox, tracker_names, widths, paddings, ground_truth=None, max_frames=None):
+    configs = [('full', None, None)]
+    configs += [(f'width={w}', w, None) for w in widths]
+    configs += [(f'crop={p}', None, p) for p in paddings]
+    configs += [(f'width={w},crop={p}', w, p) for w in widths for p in paddings]
+    results = []
+    baseline = {}
+    for label, width, padding in configs:
+        trajectories, report = run_video(video, bbox, tracker_names, parallel=False, max_frames=max_frames,
+                                         tracking_width=width, crop_padding=padding)
+        for name in tracker_names:
+            boxes = trajectory_boxes(trajectories[name])
+            if label == 'full':
+                baseline[name] = (boxes, report['trackers'][name]['fps'])
+            # Without ground truth, accuracy is agreement with the full-resolution run
+            reference = ground_truth * gt_scale(report) if ground_truth is not None else baseline[name][0]
+            row = {'config': label, 'tracker': name, 'fps': report['trackers'][name]['fps'],
+                   'speedup': report['trackers'][name]['fps'] / baseline[name][1] if baseline[name][1] else 0.0}
+            row.update(compare(boxes, reference))
+            results.append(row)
+    return results
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Compare tracking speed and accuracy at reduced resolutions.')
+    parser.add_argument('video', help='Input video file')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--bbox', type=parse_bbox, help='Initial box "x,y,w,h" in resized-frame coordinates')
+    group.add_argument('--bbox-file', help='Text file whose first line is "x,y,w,h"')
+    parser.add_argument('--trackers', nargs='+', choices=list(TRACKER_TYPES.keys()),
+                        default=default_trackers(), help='Trackers to run')
+    parser.add_argument('--widths', nargs='*', type=int, default=[640, 320], help='Tracking widths to try')
+    parser.add_argument('--crop-paddings', nargs='*', type=float, default=[1.5], help='Crop paddings to try')
+    parser.add_argument('--ground-truth', help='Ground truth (frame,x,y,w,h in source pixels); defaults to the full-resolution run')
+    parser.add_argument('--max-frames', type=int, default=None, help='Stop after this many frames')
+    parser.add_argument('--output', help='Write the results table as JSON')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    bbox = args.bbox if args.bbox is not None else read_bbox_file(args.bbox_file)
+    ground_truth = load_ground_truth(args.ground_truth) if args.ground_truth else None
+    results = run_benchmark(args.video, bbox, args.trackers, args.widths, args.crop_paddings,
+                            ground_truth, args.max_frames)
+    print(f"{'config':<20} {'tracker':<10} {'fps':>8} {'speedup':>8} {'IoU':>6} {'SR@0.5':>7} {'AUC':>6}")
+    for row in results:
+        print(f"{row['config']:<20} {row['tracker']:<10} {row['fps']:8.1f} {row['speedup']:7.2f}x "
+              f"{row['mean_iou']:6.3f} {row['success_50']:7.3f} {row['auc']:6.3f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
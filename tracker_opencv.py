@@ -1,25 +1,30 @@
+import os
 import sys
+import json
 import cv2
 import time
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QLabel, 
                            QPushButton, QVBoxLayout, QHBoxLayout, QFileDialog,
-                           QMenuBar, QMenu, QAction, QStatusBar, QFrame, QGroupBox)
+                           QMenuBar, QMenu, QAction, QActionGroup, QStatusBar, QFrame, QGroupBox,
+                           QSlider, QInputDialog)
 from PyQt5.QtCore import Qt, QTimer, pyqtSlot, QPoint, QRect
-from PyQt5.QtGui import QImage, QPixmap, QPainter, QColor, QPen, QCursor
-
-TRACKER_TYPES = {
-    'CSRT': cv2.legacy.TrackerCSRT_create if hasattr(cv2, 'legacy') else cv2.TrackerCSRT_create,
-    'KCF': cv2.legacy.TrackerKCF_create if hasattr(cv2, 'legacy') else cv2.TrackerKCF_create,
-    'Boosting': cv2.legacy.TrackerBoosting_create if hasattr(cv2, 'legacy') else cv2.TrackerBoosting_create,
-    'MIL': cv2.legacy.TrackerMIL_create if hasattr(cv2, 'legacy') else cv2.TrackerMIL_create,
-}
-
-TRACKER_COLORS = {
-    'CSRT': (0, 255, 0),      # Green
-    'KCF': (255, 0, 0),      # Blue
-    'Boosting': (0, 255, 255), # Yellow
-    'MIL': (255, 0, 255),    # Magenta
-}
+from PyQt5.QtGui import QImage, QPixmap, QPainter, QColor, QPen, QCursor, QFont
+from tracker_registry import TRACKER_TYPES, TRACKER_COLORS, default_trackers
+from tracking import resize_frame, MultiTargetTracker, RealtimeScheduler
+from overlays import draw_box, draw_reference, draw_reference_intro, draw_legend
+from video_io import FramePrefetcher, AsyncVideoWriter, FrameIndex, FrameCache, BufferPool, read_frame_at
+from profiling import AllocationMeter, Profiler
+from live_source import LatestFrameGrabber, open_live_source
+from trajectory_cache import TrajectoryCache, TrajectoryRecorder, trajectory_key
+from evaluation import load_ground_truth, history_boxes, evaluate_batch
+
+# Qt >= 5.14 can wrap BGR buffers directly, which saves a cvtColor per frame
+BGR_IMAGE_FORMAT = getattr(QImage, 'Format_BGR888', None)
+
+def bgr_to_qcolor(color, alpha=255):
+    b, g, r = color
+    return QColor(r, g, b, alpha)
 
 class VideoDisplay(QLabel):
     def __init__(self, tracker_app):
@@ -38,6 +43,18 @@ class VideoDisplay(QLabel):
         self.display_offset_y = 0
         self.frame_shape = None  
         self.mouse_pos = None
+        self.base_pixmap = None
+        self.base_key = None
+        self.base_rect = None
+        self.base_frame = None
+        self.scaled_buffer = None
+        self.rgb_buffer = None
+        self.overlay_font = QFont()
+        self.overlay_font.setPointSize(11)
+        self.overlay_font.setBold(True)
+        self.profile_font = QFont('Monospace')
+        self.profile_font.setStyleHint(QFont.TypeWriter)
+        self.profile_font.setPointSize(9)
 
     def set_frame(self, frame):
         self.frame_shape = frame.shape[:2]
@@ -63,6 +80,8 @@ class VideoDisplay(QLabel):
             self.temp_bbox = None
             self.setCursor(QCursor(Qt.CrossCursor))
             self.update()
+        elif event.button() == Qt.RightButton:
+            self.tracker_app.remove_target_at(*self.map_to_image(event.x(), event.y()))
 
     def mouseMoveEvent(self, event):
         if self.drawing and self.drawing_enabled:
@@ -76,8 +95,12 @@ class VideoDisplay(QLabel):
             self.mouse_pos = (event.x(), event.y())
             self.update()
         elif self.drawing_enabled:
+            # Hover only moves the crosshair, so repaint just the old and new spots
+            old_pos = self.mouse_pos
             self.mouse_pos = (event.x(), event.y())
-            self.update()
+            self.update(self.crosshair_rect(self.mouse_pos))
+            if old_pos is not None:
+                self.update(self.crosshair_rect(old_pos))
 
     def mouseReleaseEvent(self, event):
         if self.drawing and self.drawing_enabled:
@@ -108,71 +131,193 @@ class VideoDisplay(QLabel):
         self.mouse_pos = None
         self.update()
 
-    def paintEvent(self, event):
-        if self.tracker_app.frame is not None:
-            frame = self.tracker_app.frame.copy()
-            self.tracker_app.draw_boxes(frame)
-            if not self.tracker_app.paused:
-                cv2.putText(frame, f'FPS: {self.tracker_app.fps:.2f}', (10, 30),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 2)
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            h, w, ch = rgb_frame.shape
-            label_w, label_h = self.width(), self.height()
-            scale = min(label_w / w, label_h / h)
-            new_w, new_h = int(w * scale), int(h * scale)
-            offset_x = (label_w - new_w) // 2
-            offset_y = (label_h - new_h) // 2
-            self.display_scale = scale
-            self.display_offset_x = offset_x
-            self.display_offset_y = offset_y
-            qt_image = QImage(rgb_frame.data, w, h, ch * w, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(qt_image).scaled(new_w, new_h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            painter = QPainter(self)
-            painter.fillRect(self.rect(), QColor(24, 24, 24))
-            painter.drawPixmap(offset_x, offset_y, pixmap)
-            if (self.drawing and self.temp_bbox) or (self.drawing_enabled and self.mouse_pos):
-                if self.temp_bbox:
-                    x, y, w_box, h_box = self.temp_bbox
-                    wx, wy = self.map_to_widget(x, y)
-                    wx2, wy2 = self.map_to_widget(x + w_box, y + h_box)
-                    rect = QRect(QPoint(wx, wy), QPoint(wx2, wy2))
-                    overlay_color = QColor(255, 255, 0, 60)
-                    painter.setBrush(overlay_color)
-                    pen = QPen(QColor(255, 255, 0), 2, Qt.DashLine)
-                    painter.setPen(pen)
-                    painter.drawRect(rect)
-                if self.mouse_pos:
-                    mx, my = self.mouse_pos
-                    painter.setPen(QPen(QColor(255, 255, 255, 180), 1, Qt.SolidLine))
-                    painter.drawLine(mx - 10, my, mx + 10, my)
-                    painter.drawLine(mx, my - 10, mx, my + 10)
-            painter.end()
+    def crosshair_rect(self, pos):
+        mx, my = pos
+        return QRect(mx - 12, my - 12, 25, 25)
+
+    def update_base_pixmap(self, frame):
+        # The scaled frame only changes with the frame object or the widget size
+        label_w, label_h = self.width(), self.height()
+        key = (label_w, label_h)
+        if self.base_pixmap is not None and self.base_key == key and self.base_frame is frame:
+            return self.base_pixmap
+        h, w = frame.shape[:2]
+        scale = min(label_w / w, label_h / h)
+        new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
+        offset_x = (label_w - new_w) // 2
+        offset_y = (label_h - new_h) // 2
+        self.display_scale = scale
+        self.display_offset_x = offset_x
+        self.display_offset_y = offset_y
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        # The scaled and converted images and the pixmap are reused; the letterbox
+        # is only cleared when the image lands somewhere else in the widget
+        scaled = self.scaled_buffer = cv2.resize(frame, (new_w, new_h), dst=self.scaled_buffer,
+                                                 interpolation=interpolation)
+        if BGR_IMAGE_FORMAT is not None:
+            qt_image = QImage(scaled.data, new_w, new_h, scaled.strides[0], BGR_IMAGE_FORMAT)
         else:
+            scaled = self.rgb_buffer = cv2.cvtColor(scaled, cv2.COLOR_BGR2RGB, dst=self.rgb_buffer)
+            qt_image = QImage(scaled.data, new_w, new_h, scaled.strides[0], QImage.Format_RGB888)
+        rect = (offset_x, offset_y, new_w, new_h)
+        pixmap = self.base_pixmap
+        if pixmap is None or self.base_key != key:
+            pixmap = QPixmap(label_w, label_h)
+            pixmap.fill(QColor(24, 24, 24))
+        elif self.base_rect != rect:
+            pixmap.fill(QColor(24, 24, 24))
+        base_painter = QPainter(pixmap)
+        base_painter.drawImage(offset_x, offset_y, qt_image)
+        base_painter.end()
+        self.base_pixmap = pixmap
+        self.base_key = key
+        self.base_rect = rect
+        self.base_frame = frame
+        return pixmap
+
+    def widget_rect(self, bbox):
+        x, y, w, h = bbox
+        wx, wy = self.map_to_widget(x, y)
+        wx2, wy2 = self.map_to_widget(x + w, y + h)
+        return QRect(QPoint(wx, wy), QPoint(wx2, wy2))
+
+    def paint_boxes(self, painter):
+        app = self.tracker_app
+        painter.setBrush(Qt.NoBrush)
+        for target, state in app.targets.states():
+            if state.bbox is not None:
+                rect = self.widget_rect(state.bbox)
+                painter.setPen(QPen(bgr_to_qcolor(TRACKER_COLORS[state.name]), 2))
+                painter.drawRect(rect)
+                painter.drawText(rect.left(), rect.top() - 6, app.box_label(target, state))
+        if app.show_reference_bbox and self.bbox:
+            rect = self.widget_rect(self.bbox)
+            painter.setPen(QPen(QColor(255, 255, 0), 2))
+            painter.drawRect(rect)
+            painter.drawText(rect.left(), rect.bottom() + 20, 'Reference')
+
+    def paint_legend(self, painter):
+        box_w, box_h = 18, 18
+        x0 = self.base_pixmap.width() - self.display_offset_x - 150
+        y0 = self.display_offset_y + 16
+        for i, name in enumerate(self.tracker_app.legend_names()):
+            y = y0 + i * (box_h + 8)
+            painter.setPen(QPen(QColor(255, 255, 255), 1))
+            painter.setBrush(bgr_to_qcolor(TRACKER_COLORS[name]))
+            painter.drawRect(x0, y, box_w, box_h)
+            painter.drawText(x0 + box_w + 8, y + box_h - 3, name)
+
+    def paint_profile(self, painter):
+        # Rolling per-stage latency, listed under the legend
+        lines = [f"{'stage':<10}{'p50':>6} /{'p95':>6} /{'p99':>6} ms"]
+        for name, stats in self.tracker_app.profiler.summary().items():
+            if stats.get('p50_ms') is not None:
+                lines.append(f"{name:<10}{stats['p50_ms']:6.1f} /{stats['p95_ms']:6.1f} /{stats['p99_ms']:6.1f}")
+        allocations = self.tracker_app.allocations.summary(self.tracker_app.profiler.window)
+        if allocations['count']:
+            lines.append(f"{'alloc KB':<10}{allocations['p50_kb']:6.0f} /{allocations['p95_kb']:6.0f} /"
+                         f"{allocations['p99_kb']:6.0f}")
+        painter.setFont(self.profile_font)
+        metrics = painter.fontMetrics()
+        line_h = metrics.height() + 2
+        width = max(metrics.width(line) for line in lines) + 12
+        x0 = self.base_pixmap.width() - self.display_offset_x - width - 10
+        y0 = self.display_offset_y + 16 + len(self.tracker_app.legend_names()) * 26 + 8
+        painter.setBrush(QColor(0, 0, 0, 150))
+        painter.setPen(Qt.NoPen)
+        painter.drawRect(x0, y0, width, line_h * len(lines) + 8)
+        painter.setPen(QColor(255, 255, 255))
+        for i, line in enumerate(lines):
+            painter.drawText(x0 + 6, y0 + 4 + line_h * i + metrics.ascent(), line)
+
+    def paintEvent(self, event):
+        frame, annotated = self.tracker_app.display_frame()
+        if frame is None:
             super().paintEvent(event)
+            return
+        paint_start = time.perf_counter()
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.update_base_pixmap(frame))
+        painter.setFont(self.overlay_font)
+        if not annotated:
+            self.paint_boxes(painter)
+            self.paint_legend(painter)
+        if not self.tracker_app.paused and not annotated:
+            painter.setPen(QColor(255, 255, 255))
+            painter.drawText(self.display_offset_x + 10, self.display_offset_y + 24,
+                             f'FPS: {self.tracker_app.fps:.2f}')
+        if (self.drawing and self.temp_bbox) or (self.drawing_enabled and self.mouse_pos):
+            if self.temp_bbox:
+                overlay_color = QColor(255, 255, 0, 60)
+                painter.setBrush(overlay_color)
+                pen = QPen(QColor(255, 255, 0), 2, Qt.DashLine)
+                painter.setPen(pen)
+                painter.drawRect(self.widget_rect(self.temp_bbox))
+            if self.mouse_pos:
+                mx, my = self.mouse_pos
+                painter.setPen(QPen(QColor(255, 255, 255, 180), 1, Qt.SolidLine))
+                painter.drawLine(mx - 10, my, mx + 10, my)
+                painter.drawLine(mx, my - 10, mx, my + 10)
+        if self.tracker_app.show_profile:
+            self.paint_profile(painter)
+        painter.end()
+        if not self.tracker_app.paused:
+            self.tracker_app.profiler.add('paint', time.perf_counter() - paint_start)
 
 class TrackerApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.video_path = None
         self.cap = None
+        self.live = False
+        self.prefetcher = None
+        self.prefetch_size = 8
+        self.frame_index = None
+        self.frame_cache = FrameCache()
         self.frame = None
+        # Resized and annotated frames come from here; buffers still held by
+        # the frame cache, the writer or the display are not reused
+        self.frame_pool = BufferPool()
+        self.annotated_frame = None
+        self.allocations = AllocationMeter()
         self.paused = True
-        self.trackers = {}
+        self.reacquire_interval = 5
+        self.targets = MultiTargetTracker(self.reacquire_interval)
+        self.tracker_names = default_trackers()
         self.fps = 0
         self.frame_count = 0
         self.last_time = time.time()
         self.target_width = 1280
         self.target_height = 720
         self.video_writer = None  
+        self.writer_queue_size = 64
+        self.writer_policy = 'block'
         self.output_video_path = None
         self.saving_video = False
         self.show_reference_bbox = False  
         self.reference_bbox_timer = None
         self.reference_frame = None
         self.reference_pause_written = False  
+        self.parallel_update = True
+        self.realtime = False
+        self.source_fps = 30
+        self.scheduler = RealtimeScheduler(self.source_fps)
+        self.tracking_width = None
+        self.crop_padding = None
+        self.profiler = Profiler()
+        self.trajectory_cache = TrajectoryCache()
+        self.use_trajectory_cache = True
+        self.video_hash = None
+        self.ground_truth = None
+        self.show_profile = False
+        # Persistent workers shared by every (target, tracker) pair; OpenCV
+        # releases the GIL in update(), so this scales with cores
+        self.tracker_pool = ThreadPoolExecutor(max_workers=max(len(TRACKER_TYPES), os.cpu_count() or 1))
         self.init_ui()
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
+        self.index_timer = QTimer()
+        self.index_timer.timeout.connect(self.check_frame_index)
 
     def init_ui(self):
         central_widget = QWidget()
@@ -186,6 +331,17 @@ class TrackerApp(QMainWindow):
         video_layout = QVBoxLayout(video_group)
         self.video_display = VideoDisplay(self)
         video_layout.addWidget(self.video_display)
+        timeline_layout = QHBoxLayout()
+        self.timeline = QSlider(Qt.Horizontal)
+        self.timeline.setEnabled(False)
+        self.timeline.valueChanged.connect(self.on_timeline_changed)
+        self.timeline.sliderReleased.connect(self.on_timeline_released)
+        self.timeline_label = QLabel('0 / 0')
+        self.timeline_label.setMinimumWidth(110)
+        self.timeline_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        timeline_layout.addWidget(self.timeline)
+        timeline_layout.addWidget(self.timeline_label)
+        video_layout.addLayout(timeline_layout)
         main_layout.addWidget(video_group)
         button_layout = QHBoxLayout()
         self.load_btn = QPushButton('Load Video')
@@ -213,11 +369,63 @@ class TrackerApp(QMainWindow):
         open_action = QAction('Open Video', self)
         open_action.setShortcut('Ctrl+O')
         open_action.triggered.connect(self.load_video)
+        live_action = QAction('Open Live Source...', self)
+        live_action.triggered.connect(self.open_live)
         exit_action = QAction('Exit', self)
         exit_action.setShortcut('Ctrl+Q')
         exit_action.triggered.connect(self.close)
+        export_profile_action = QAction('Export Profile...', self)
+        export_profile_action.triggered.connect(self.export_profile)
+        ground_truth_action = QAction('Load Ground Truth...', self)
+        ground_truth_action.triggered.connect(self.load_ground_truth)
         file_menu.addAction(open_action)
+        file_menu.addAction(live_action)
+        file_menu.addAction(ground_truth_action)
+        file_menu.addAction(export_profile_action)
         file_menu.addAction(exit_action)
+        tracking_menu = menubar.addMenu('Tracking')
+        self.parallel_action = QAction('Parallel Tracker Update', self, checkable=True)
+        self.parallel_action.setChecked(self.parallel_update)
+        self.parallel_action.toggled.connect(self.set_parallel_update)
+        tracking_menu.addAction(self.parallel_action)
+        trackers_menu = tracking_menu.addMenu('Trackers for New Targets')
+        for name in TRACKER_TYPES.keys():
+            action = QAction(name, self, checkable=True)
+            action.setChecked(name in self.tracker_names)
+            action.toggled.connect(lambda checked, name=name: self.set_tracker_enabled(name, checked))
+            trackers_menu.addAction(action)
+        self.realtime_action = QAction('Real-Time Playback', self, checkable=True)
+        self.realtime_action.toggled.connect(self.set_realtime)
+        tracking_menu.addAction(self.realtime_action)
+        resolution_menu = tracking_menu.addMenu('Tracking Resolution')
+        resolution_group = QActionGroup(self)
+        for label, width in [('Full', None), ('960 px', 960), ('640 px', 640), ('320 px', 320)]:
+            action = QAction(label, self, checkable=True)
+            action.setChecked(width == self.tracking_width)
+            action.triggered.connect(lambda checked, width=width: self.set_tracking_width(width))
+            resolution_group.addAction(action)
+            resolution_menu.addAction(action)
+        self.reacquire_action = QAction('Suspend and Re-acquire Lost Trackers', self, checkable=True)
+        self.reacquire_action.setChecked(self.reacquire_interval is not None)
+        self.reacquire_action.toggled.connect(self.set_reacquire)
+        tracking_menu.addAction(self.reacquire_action)
+        self.crop_action = QAction('Track on Search-Window Crop', self, checkable=True)
+        self.crop_action.toggled.connect(self.set_crop_tracking)
+        tracking_menu.addAction(self.crop_action)
+        self.drop_frames_action = QAction('Drop Frames When Writer Is Busy', self, checkable=True)
+        self.drop_frames_action.setChecked(self.writer_policy == 'drop')
+        self.drop_frames_action.toggled.connect(self.set_writer_drop_policy)
+        tracking_menu.addAction(self.drop_frames_action)
+        self.profile_action = QAction('Show Profiling Overlay', self, checkable=True)
+        self.profile_action.toggled.connect(self.set_show_profile)
+        tracking_menu.addAction(self.profile_action)
+        self.allocations_action = QAction('Trace Allocations', self, checkable=True)
+        self.allocations_action.toggled.connect(self.set_trace_allocations)
+        tracking_menu.addAction(self.allocations_action)
+        self.cache_action = QAction('Use Trajectory Cache', self, checkable=True)
+        self.cache_action.setChecked(self.use_trajectory_cache)
+        self.cache_action.toggled.connect(self.set_use_trajectory_cache)
+        tracking_menu.addAction(self.cache_action)
         self.setWindowTitle('Multi-Tracker Comparison')
         self.setGeometry(100, 100, 1100, 900)
         self.draw_btn.setEnabled(False)
@@ -232,24 +440,100 @@ class TrackerApp(QMainWindow):
             "Video Files (*.mp4 *.avi *.mov *.mkv *.wmv *.flv *.webm)"
         )
         if file_name:
+            self.close_source()
             self.video_path = file_name
+            self.video_hash = None
+            self.ground_truth = None
             self.cap = cv2.VideoCapture(self.video_path)
+            self.source_fps = self.cap.get(cv2.CAP_PROP_FPS)
+            if not self.source_fps or self.source_fps < 1:
+                self.source_fps = 30
             self.frame_count = 0
             self.paused = True
-            self.trackers = {}
+            self.targets = MultiTargetTracker(self.reacquire_interval)
+            self.scheduler = RealtimeScheduler(self.source_fps)
             self.fps = 0
             self.last_time = time.time()
+            self.frame_cache.clear()
             self.read_first_frame()
+            self.profiler.reset()
+            self.frame_index = FrameIndex(self.video_path)
+            self.frame_index.start()
+            self.index_timer.start(500)
+            self.prefetcher = FramePrefetcher(self.cap, self.resize_frame, self.prefetch_size, self.profiler,
+                                              self.frame_cache, self.frame_index)
+            self.timeline.setEnabled(True)
+            self.set_timeline_range(int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+            self.set_timeline(0)
             self.draw_btn.setEnabled(True)
             self.play_btn.setEnabled(False)
             self.reset_btn.setEnabled(True)
             self.instruction_label.setText('Click "Draw Box" and drag to select ROI.')
 
+    def close_source(self):
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+            self.prefetcher = None
+        self.index_timer.stop()
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        self.live = False
+
+    def open_live(self):
+        spec, ok = QInputDialog.getText(self, 'Open Live Source',
+                                        'Camera index, stream URL or "synthetic":', text='0')
+        if not ok or not spec.strip():
+            return
+        try:
+            reader = open_live_source(spec.strip())
+        except (IOError, ValueError) as e:
+            self.statusBar.showMessage(str(e))
+            return
+        self.close_source()
+        self.live = True
+        self.video_path = None
+        self.video_hash = None
+        self.ground_truth = None
+        self.cap = reader
+        self.source_fps = reader.fps or 30
+        self.frame_count = 0
+        self.paused = True
+        self.targets = MultiTargetTracker(self.reacquire_interval)
+        self.scheduler = RealtimeScheduler(self.source_fps)
+        self.fps = 0
+        self.last_time = time.time()
+        self.frame_cache.clear()
+        self.profiler.reset()
+        self.frame_index = None
+        # The grabber keeps running while paused so the source never backs up
+        self.prefetcher = LatestFrameGrabber(reader, self.resize_frame, self.profiler)
+        self.prefetcher.start()
+        ret, item = self.prefetcher.read(timeout=5.0)
+        if not ret:
+            self.statusBar.showMessage('No frames from live source')
+            return
+        self.frame_count, self.frame = item
+        self.update_display()
+        self.timeline.setEnabled(False)
+        self.timeline_label.setText('Live')
+        self.draw_btn.setEnabled(True)
+        self.play_btn.setEnabled(False)
+        self.reset_btn.setEnabled(True)
+        self.instruction_label.setText('Live: click "Draw Box" and drag to select ROI on the frozen frame.')
+        self.statusBar.showMessage(f'Live source {spec.strip()} opened')
+
+    def live_message(self):
+        stats = self.profiler.summary().get('glass_to_box', {})
+        latency = f"glass-to-box p50 {stats['p50_ms']:.0f} / p95 {stats['p95_ms']:.0f} ms, " if 'p50_ms' in stats else ''
+        return f'Live: {latency}dropped {self.prefetcher.dropped} of {self.prefetcher.grabbed} frames'
+
     def read_first_frame(self):
         if self.cap:
             ret, frame = self.cap.read()
             if ret:
                 self.frame = self.resize_frame(frame)
+                self.frame_cache.put(0, self.frame)
                 self.video_display.set_frame(self.frame)
                 self.video_display.update()
                 self.instruction_label.setText('Click "Draw Box" and drag to select ROI.')
@@ -259,49 +543,87 @@ class TrackerApp(QMainWindow):
                 self.instruction_label.setText('Failed to read video.')
 
     def resize_frame(self, frame):
-        height, width = frame.shape[:2]
-        scale_width = self.target_width / width
-        scale_height = self.target_height / height
-        scale = min(scale_width, scale_height)
-        new_width = int(width * scale)
-        new_height = int(height * scale)
-        return cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
+        return resize_frame(frame, self.target_width, self.target_height, self.frame_pool)
+
+    def check_frame_index(self):
+        # The container's frame count is an estimate until the index is built
+        if self.frame_index is not None and self.frame_index.ready:
+            self.index_timer.stop()
+            self.set_timeline_range(len(self.frame_index))
+
+    def set_timeline_range(self, frames):
+        self.timeline.blockSignals(True)
+        self.timeline.setRange(0, max(0, frames - 1))
+        self.timeline.blockSignals(False)
+        self.set_timeline(self.timeline.value())
+
+    def set_timeline(self, frame_number):
+        if self.live:
+            return
+        self.timeline.blockSignals(True)
+        self.timeline.setValue(frame_number)
+        self.timeline.blockSignals(False)
+        self.timeline_label.setText(f'{frame_number} / {self.timeline.maximum()}')
+
+    def on_timeline_changed(self, value):
+        # Dragging seeks once on release; clicks and keys seek immediately
+        if not self.timeline.isSliderDown():
+            self.seek_to(value)
+
+    def on_timeline_released(self):
+        self.seek_to(self.timeline.value())
+
+    def seek_to(self, frame_number):
+        # Shows frame_number and clears targets so a new ROI can be drawn on it
+        if self.cap is None or self.live:
+            return
+        if not self.paused:
+            # The targets are cleared, so playback stops on the new frame
+            self.toggle_play()
+        self.prefetcher.stop()
+        frame = self.frame_cache.get(frame_number)
+        if frame is not None:
+            # Repositioning the capture is left to the prefetch thread
+            self.prefetcher.seek(frame_number + 1)
+        else:
+            self.prefetcher.clear()
+            ret, raw = read_frame_at(self.cap, frame_number, self.frame_index)
+            if not ret:
+                self.statusBar.showMessage(f'Failed to seek to frame {frame_number}')
+                return
+            frame = self.resize_frame(raw)
+            self.frame_cache.put(frame_number, frame)
+        self.frame = frame
+        self.frame_count = frame_number + 1
+        self.set_timeline(frame_number)
+        self.clear_targets()
 
     def update_display(self):
         self.video_display.set_frame(self.frame)
         self.video_display.update()
 
+    def display_frame(self):
+        # While saving, the display shows the frame rendered for the writer
+        # rather than painting the same overlays a second time
+        if self.annotated_frame is not None and not self.paused:
+            return self.annotated_frame, True
+        return self.frame, False
+
+    def box_label(self, target, state):
+        return state.name if len(self.targets) == 1 else f'{state.name} #{target.id}'
+
+    def legend_names(self):
+        # Trackers enabled for new targets or following an existing one
+        used = set(self.tracker_names) | {state.name for _, state in self.targets.states()}
+        return [name for name in TRACKER_TYPES if name in used]
+
     def draw_boxes(self, frame):
-        for name in TRACKER_TYPES.keys():
-            bbox = self.trackers.get(name + '_bbox', None)
-            color = TRACKER_COLORS[name]
-            if bbox is not None:
-                x, y, w, h = [int(v) for v in bbox]
-                cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
-                cv2.putText(frame, name, (x, y - 10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+        for target, state in self.targets.states():
+            if state.bbox is not None:
+                draw_box(frame, state.bbox, TRACKER_COLORS[state.name], self.box_label(target, state))
         if self.show_reference_bbox and self.video_display and self.video_display.bbox:
-            x, y, w, h = [int(v) for v in self.video_display.bbox]
-            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 255), 2)
-            cv2.putText(frame, 'Reference', (x, y + h + 25),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-        self.draw_legend(frame)
-
-    def draw_legend(self, frame):
-        legend_items = list(TRACKER_TYPES.keys())
-        box_w, box_h = 22, 22
-        pad = 10
-        font_scale = 0.7
-        thickness = 2
-        x0 = frame.shape[1] - 180  
-        y0 = 20
-        for i, name in enumerate(legend_items):
-            color = TRACKER_COLORS[name]
-            y = y0 + i * (box_h + 8)
-            cv2.rectangle(frame, (x0, y), (x0 + box_w, y + box_h), color, -1)
-            cv2.rectangle(frame, (x0, y), (x0 + box_w, y + box_h), (255,255,255), 1)
-            cv2.putText(frame, name, (x0 + box_w + 8, y + box_h - 5),
-                        cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255,255,255), thickness)
+            draw_reference(frame, self.video_display.bbox)
+        draw_legend(frame, self.legend_names())
 
     def start_drawing(self):
         if self.frame is not None:
@@ -317,10 +639,7 @@ class TrackerApp(QMainWindow):
     def on_roi_selected(self):
         if self.video_display.bbox:
             self.reference_frame = self.frame.copy()
-            x, y, w, h = [int(v) for v in self.video_display.bbox]
-            cv2.rectangle(self.reference_frame, (x, y), (x + w, y + h), (0, 255, 255), 3)
-            cv2.putText(self.reference_frame, 'Reference Box Selected', (x, y - 20),
-                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 3, cv2.LINE_AA)
+            draw_reference_intro(self.reference_frame, self.video_display.bbox)
             self.show_reference_bbox = True
             self.reference_pause_written = False  
             if self.reference_bbox_timer is not None:
@@ -330,30 +649,203 @@ class TrackerApp(QMainWindow):
             self.reference_bbox_timer.timeout.connect(self.hide_reference_bbox)
             self.reference_bbox_timer.start(1000)
             self.update_display()
-            self.init_trackers()
-            self.statusBar.showMessage('ROI selected. Press Play to start tracking')
+            target = self.add_target()
+            cached = [state.name for state in target.trackers.values() if state.cached is not None]
+            replay = f" ({', '.join(cached)} replayed from cache)" if cached else ''
+            self.statusBar.showMessage(f'Target {target.id} added{replay}. Draw Box adds another; '
+                                       'right-click a box to remove it')
             self.instruction_label.setText('ROI selected. Press Play to start tracking.')
             self.play_btn.setEnabled(True)
+        else:
+            self.play_btn.setEnabled(len(self.targets) > 0)
 
     def hide_reference_bbox(self):
         self.show_reference_bbox = False
         self.update_display()
 
-    def init_trackers(self):
-        self.trackers = {}
-        for name, ctor in TRACKER_TYPES.items():
-            tracker = ctor()
-            tracker.init(self.frame, self.video_display.bbox)
-            self.trackers[name] = tracker
+    def current_frame_number(self):
+        # frame_count is the capture position after reading the current frame
+        return max(self.frame_count - 1, 0)
+
+    def cache_key(self, name, bbox, start_frame):
+        params = {
+            'tracking_width': self.tracking_width,
+            'crop_padding': self.crop_padding,
+            'target_size': [self.target_width, self.target_height],
+            'reacquire_interval': self.reacquire_interval,
+        }
+        if self.reacquire_interval is not None:
+            # Re-acquisition follows the consensus of the target's other
+            # trackers, so a trajectory depends on which ones ran with it
+            params['trackers'] = sorted(self.tracker_names)
+        return trajectory_key(self.video_hash, start_frame, bbox, name, params)
+
+    def add_target(self):
+        # Existing targets keep their trackers; only the new one is initialized
+        bbox = self.video_display.bbox
+        start_frame = self.current_frame_number()
+
+        def lookup(name):
+            return self.trajectory_cache.load(self.cache_key(name, bbox, start_frame))
+
+        # The frame index hashes the video in the background. Until it has,
+        # targets are tracked without the cache rather than hashing a large
+        # file on the GUI thread. A live source can't be replayed at all.
+        if self.video_hash is None and self.frame_index is not None:
+            self.video_hash = self.frame_index.content_hash
+        use_cache = self.use_trajectory_cache and not self.live and self.video_hash is not None
+        target = self.targets.add_target(self.frame, bbox, self.tracker_names, self.tracking_width,
+                                         self.crop_padding, lookup if use_cache else None)
+        for state in target.trackers.values():
+            state.history[start_frame] = tuple(bbox)
+        if use_cache:
+            for state in target.trackers.values():
+                if state.cached is None:
+                    state.recorder = TrajectoryRecorder(start_frame, bbox)
+                    state.cache_key = self.cache_key(state.name, bbox, start_frame)
+        return target
+
+    def store_trajectories(self):
+        # Only runs that tracked every frame up to the end of the video are kept
+        stored = 0
+        for target, state in self.targets.states():
+            if state.recorder is not None and self.trajectory_cache.store(
+                    state.cache_key, state.recorder, {'video': self.video_path, 'tracker': state.name}):
+                stored += 1
+            state.recorder = None
+        return stored
+
+    def remove_target_at(self, x, y):
+        target = self.targets.target_at(x, y)
+        if target is not None:
+            self.targets.remove_target(target.id)
+            self.statusBar.showMessage(f'Target {target.id} removed')
+            self.update_display()
+
+    def set_tracker_enabled(self, name, enabled):
+        # Applies to targets added afterwards
+        if enabled and name not in self.tracker_names:
+            self.tracker_names = [n for n in TRACKER_TYPES.keys() if n in self.tracker_names or n == name]
+        elif not enabled and name in self.tracker_names:
+            self.tracker_names.remove(name)
+
+    def set_parallel_update(self, enabled):
+        self.parallel_update = enabled
+
+    def set_realtime(self, enabled):
+        self.realtime = enabled
+        if not self.paused:
+            self.start_timer()
+
+    def start_timer(self):
+        if self.live:
+            # read() waits briefly for the next frame, so poll without a delay
+            self.timer.start(1)
+        elif self.realtime:
+            self.scheduler.start(self.frame_count)
+            self.timer.start(0)
+        else:
+            self.timer.start(30)
+
+    def realtime_message(self):
+        report = self.scheduler.report()
+        skipped = ', '.join(f'{name} #{target_id} {count}'
+                            for (target_id, name), count in report['skipped_updates'].items())
+        return f"Real-time: dropped {report['dropped_frames']} frames, skipped updates: {skipped or 'none'}"
+
+    def set_use_trajectory_cache(self, enabled):
+        # Applies to targets added afterwards
+        self.use_trajectory_cache = enabled
+
+    def set_tracking_width(self, width):
+        # Takes effect for targets added afterwards
+        self.tracking_width = width
+
+    def set_reacquire(self, enabled):
+        # Off means lost trackers keep being updated every frame
+        self.reacquire_interval = 5 if enabled else None
+        self.targets.reacquire_interval = self.reacquire_interval
+
+    def lost_message(self):
+        report = self.targets.lost_report()
+        lost = ', '.join(f"{name} #{target_id} {counts['lost']}/{counts['recovered']}"
+                         for (target_id, name), counts in report.items() if counts['lost'])
+        return f'Lost/recovered: {lost}' if lost else ''
+
+    def set_crop_tracking(self, enabled):
+        self.crop_padding = 1.5 if enabled else None
+
+    def set_show_profile(self, enabled):
+        self.show_profile = enabled
+        self.video_display.update()
+
+    def set_trace_allocations(self, enabled):
+        # Bytes allocated per played frame, listed in the profiling overlay
+        if enabled:
+            self.allocations.start()
+        else:
+            self.allocations.stop()
+        self.video_display.update()
+
+    def export_profile(self):
+        file_name, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export Profile As",
+            "profile.json",
+            "JSON Files (*.json);;CSV Files (*.csv)"
+        )
+        if file_name:
+            self.profiler.export(file_name)
+            self.statusBar.showMessage(f'Profile exported to {file_name}')
+
+    def load_ground_truth(self):
+        file_name, _ = QFileDialog.getOpenFileName(
+            self,
+            "Select Ground Truth",
+            "",
+            "Ground Truth (*.csv *.txt)"
+        )
+        if file_name:
+            self.ground_truth = load_ground_truth(file_name)
+            self.statusBar.showMessage(f'Ground truth loaded: {len(self.ground_truth)} frames. '
+                                       'Trackers of the first target are scored at end of video')
+
+    def evaluate_targets(self):
+        # Ground truth describes one object, so it is compared with the first target
+        if self.ground_truth is None or len(self.targets) == 0:
+            return None
+        target = next(iter(self.targets.targets.values()))
+        states = list(target.trackers.values())
+        if self.live:
+            # Live readers have no capture properties; the grabber saw the frames
+            source_size = self.prefetcher.source_size
+            source_width = source_size[0] if source_size else 0
+        else:
+            source_width = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+        scale = self.frame.shape[1] / source_width if source_width else 1.0
+        # Only the frames the target was tracked over count; a box drawn after
+        # a seek or reset has no predictions for the frames before it
+        first = min(min(state.history) for state in states)
+        last = max(max(state.history) for state in states)
+        results = evaluate_batch([history_boxes(state.history)[first:last + 1] for state in states],
+                                 [self.ground_truth[first:last + 1]] * len(states), [scale] * len(states))
+        return {state.name: result for state, result in zip(states, results)}
+
+    def set_writer_drop_policy(self, enabled):
+        # Applies to the next video writer that is created
+        self.writer_policy = 'drop' if enabled else 'block'
 
     def update_trackers(self):
-        tracker_items = [(name, tracker) for name, tracker in self.trackers.items() if not name.endswith('_bbox')]
-        for name, tracker in tracker_items:
-            success, bbox = tracker.update(self.frame)
-            if success:
-                self.trackers[name + '_bbox'] = bbox
-            else:
-                self.trackers[name + '_bbox'] = None
+        due = None
+        if self.realtime:
+            # Trackers that aren't due keep their previous box for this frame
+            due = set(self.scheduler.trackers_due(self.frame_count, self.targets.keys()))
+        pool = self.tracker_pool if self.parallel_update else None
+        for target, state, seconds in self.targets.update(self.frame, pool, due, self.current_frame_number()):
+            self.profiler.add(state.name, seconds)
+            self.scheduler.record((target.id, state.name), self.frame_count, seconds)
+        if self.targets.reacquire_interval is not None:
+            self.profiler.add('reacquire', self.targets.reacquire_seconds)
         now = time.time()
         self.fps = 1.0 / (now - self.last_time)
         self.last_time = now
@@ -374,20 +866,21 @@ class TrackerApp(QMainWindow):
                 self.init_video_writer()
                 self.saving_video = True
         if self.saving_video and hasattr(self, 'reference_frame') and self.reference_frame is not None and (not hasattr(self, 'reference_pause_written') or not self.reference_pause_written):
-            fps = self.cap.get(cv2.CAP_PROP_FPS)
-            if not fps or fps < 1:
-                fps = 30
-            for _ in range(int(fps)):
+            for _ in range(int(self.source_fps)):
                 self.video_writer.write(self.reference_frame)
             self.reference_pause_written = True
         self.paused = not self.paused
         self.play_btn.setText('Pause' if not self.paused else 'Play')
         if not self.paused:
-            self.timer.start(30)  
+            self.prefetcher.start()
+            self.start_timer()
             self.draw_btn.setEnabled(False)
             self.instruction_label.setText('Tracking...')
         else:
             self.timer.stop()
+            if not self.live:
+                self.prefetcher.stop()
+            self.play_btn.setEnabled(len(self.targets) > 0)
             self.draw_btn.setEnabled(True)
             self.instruction_label.setText('Paused. Press Play to resume.')
 
@@ -396,64 +889,120 @@ class TrackerApp(QMainWindow):
         if self.frame is not None and self.output_video_path:
             height, width = self.frame.shape[:2]
             fourcc = cv2.VideoWriter_fourcc(*'XVID') if self.output_video_path.endswith('.avi') else cv2.VideoWriter_fourcc(*'mp4v')
-            # Try to get FPS from video file, fallback to 30
-            fps = self.cap.get(cv2.CAP_PROP_FPS)
-            if not fps or fps < 1:
-                fps = 30
-            self.video_writer = cv2.VideoWriter(self.output_video_path, fourcc, fps, (width, height))
+            self.video_writer = AsyncVideoWriter(self.output_video_path, fourcc, self.source_fps, (width, height),
+                                                 self.writer_queue_size, self.writer_policy, self.profiler)
 
     def update_frame(self):
         if self.cap and not self.paused:
-            ret, frame = self.cap.read()
+            ret, item = self.prefetcher.read(0.05 if self.live else None)
+            if not ret and self.live and not self.prefetcher.eof:
+                # No newer frame yet
+                return
+            if self.realtime and not self.live:
+                # Skip frames whose slot has passed, as long as a newer one is decoded
+                while ret and self.scheduler.is_late(item[0]) and len(self.prefetcher) > 0:
+                    self.scheduler.drop()
+                    ret, item = self.prefetcher.read()
             if ret:
-                self.frame = self.resize_frame(frame)
-                self.frame_count = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+                if self.allocations.running:
+                    self.allocations.tick()
+                self.frame_count, self.frame = item
+                self.set_timeline(self.frame_count - 1)
                 self.update_trackers()
-                out_frame = self.frame.copy()
-                self.draw_boxes(out_frame)
-                if not self.paused:
-                    cv2.putText(out_frame, f'FPS: {self.fps:.2f}', (10, 30),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 2)
+                if self.live:
+                    self.profiler.add('glass_to_box', self.prefetcher.latency())
+                self.annotated_frame = None
                 if self.saving_video and self.video_writer is not None:
+                    with self.profiler.measure('draw'):
+                        # Drawn once into a pooled buffer that the writer encodes and the display shows
+                        out_frame = self.frame_pool.acquire(self.frame.shape)
+                        out_frame[:] = self.frame
+                        self.draw_boxes(out_frame)
+                        cv2.putText(out_frame, f'FPS: {self.fps:.2f}', (10, 30),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 2)
                     self.video_writer.write(out_frame)
+                    self.annotated_frame = out_frame
+                    self.statusBar.showMessage(f'Saving: writer queue {self.video_writer.depth}, '
+                                               f'dropped {self.video_writer.dropped}')
+                elif self.live:
+                    self.statusBar.showMessage(self.live_message())
+                elif self.realtime:
+                    self.statusBar.showMessage(self.realtime_message())
                 self.update_display()
+                if self.realtime and not self.live and not self.paused:
+                    self.timer.start(int(self.scheduler.delay(self.frame_count + 1) * 1000))
             else:
                 self.paused = True
                 self.play_btn.setText('Play')
                 self.timer.stop()
-                self.statusBar.showMessage('End of video')
+                self.prefetcher.stop()
+                stored = self.store_trajectories()
+                scores = self.evaluate_targets()
+                if scores:
+                    message = 'AUC / P@20: ' + ', '.join(f"{name} {result['auc']:.3f} / {result['precision_20']:.3f}"
+                                                         for name, result in scores.items())
+                elif self.realtime:
+                    message = self.realtime_message()
+                else:
+                    message = f'{stored} trajectories cached'
+                self.statusBar.showMessage(' '.join(part for part in ['End of video.', message, self.lost_message()]
+                                                    if part))
                 self.instruction_label.setText('End of video.')
                 if self.saving_video and self.video_writer is not None:
                     self.video_writer.release()
                     self.video_writer = None
                     self.saving_video = False
+                    base = os.path.splitext(self.output_video_path)[0]
+                    self.profiler.export(base + '_profile.json')
+                    if scores:
+                        with open(base + '_evaluation.json', 'w') as f:
+                            json.dump(scores, f, indent=2)
 
     def reset(self):
         if self.cap:
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.frame_count)
-            ret, frame = self.cap.read()
+            if not self.live:
+                self.prefetcher.stop()
+            # The next frame is usually already decoded; only seek when it isn't
+            ret, item = self.prefetcher.read(1.0 if self.live else None)
             if ret:
-                self.frame = self.resize_frame(frame)
-                self.video_display.bbox = None
-                self.trackers = {}
-                self.update_display()
-                self.statusBar.showMessage('Draw new ROI')
-                self.instruction_label.setText('Draw new ROI: Click "Draw Box" and drag.')
-                self.play_btn.setEnabled(False)
-                self.draw_btn.setEnabled(True)
-                self.show_reference_bbox = False
-                if self.reference_bbox_timer is not None:
-                    self.reference_bbox_timer.stop()
-                    self.reference_bbox_timer = None
-                self.reference_pause_written = False  
+                self.frame_count, self.frame = item
+                self.set_timeline(self.frame_count - 1)
+                self.clear_targets()
+                if not self.paused:
+                    self.prefetcher.start()
+            elif not self.live:
+                self.seek_to(self.frame_count)
+
+    def clear_targets(self):
+        self.video_display.bbox = None
+        self.annotated_frame = None
+        self.targets = MultiTargetTracker(self.reacquire_interval)
+        self.scheduler = RealtimeScheduler(self.source_fps)
+        if not self.paused:
+            # Playback carries on, so the new clock starts from the current frame
+            self.scheduler.start(self.frame_count)
+        self.update_display()
+        self.statusBar.showMessage('Draw new ROI')
+        self.instruction_label.setText('Draw new ROI: Click "Draw Box" and drag.')
+        # A reset during playback keeps playing, so Pause must stay available
+        self.play_btn.setEnabled(not self.paused)
+        self.draw_btn.setEnabled(True)
+        self.show_reference_bbox = False
+        if self.reference_bbox_timer is not None:
+            self.reference_bbox_timer.stop()
+            self.reference_bbox_timer = None
+        self.reference_pause_written = False  
 
     def closeEvent(self, event):
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
         if self.cap:
             self.cap.release()
         if self.saving_video and self.video_writer is not None:
             self.video_writer.release()
             self.video_writer = None
             self.saving_video = False
+        self.tracker_pool.shutdown(wait=True)
         event.accept()
 
 if __name__ == '__main__':
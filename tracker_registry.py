@@ -0,0 +1,97 @@
+import importlib
+from collections.abc import Mapping
+
+
+class TrackerSpec:
+    # How to build one tracker type and what the app needs to know about it.
+    # factory is either a callable or a list of cv2 attribute paths tried in
+    # order; paths are resolved on first use, so registering a tracker
+    # doesn't import cv2 and a build without it just marks it unavailable.
+    # cost is the per-frame update time relative to KCF. gil_free means
+    # update() releases the GIL, so running it on a worker thread pays off.
+    def __init__(self, name, factory, color, cost=1.0, gil_free=False):
+        self.name = name
+        self.paths = [] if callable(factory) else list(factory)
+        self._factory = factory if callable(factory) else None
+        self._resolved = callable(factory)
+        self.color = color
+        self.cost = cost
+        self.gil_free = gil_free
+
+    @property
+    def factory(self):
+        if not self._resolved:
+            self._factory = self._resolve()
+            self._resolved = True
+        return self._factory
+
+    def _resolve(self):
+        cv2 = importlib.import_module('cv2')
+        for path in self.paths:
+            obj = cv2
+            for part in path.split('.'):
+                obj = getattr(obj, part, None)
+                if obj is None:
+                    break
+            if obj is not None:
+                return obj
+        return None
+
+    @property
+    def available(self):
+        return self.factory is not None
+
+    def create(self):
+        if self.factory is None:
+            raise ValueError(f'{self.name} tracker is not available in this OpenCV build')
+        return self.factory()
+
+
+TRACKERS = {}
+TRACKER_COLORS = {}
+
+
+def register_tracker(name, factory, color, cost=1.0, gil_free=False):
+    spec = TrackerSpec(name, factory, color, cost, gil_free)
+    TRACKERS[name] = spec
+    TRACKER_COLORS[name] = color
+    return spec
+
+
+class TrackerTypes(Mapping):
+    # name -> factory for the registered trackers this OpenCV build provides
+    def __getitem__(self, name):
+        spec = TRACKERS[name]
+        if not spec.available:
+            raise KeyError(name)
+        return spec.factory
+
+    def __iter__(self):
+        return (name for name, spec in TRACKERS.items() if spec.available)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+TRACKER_TYPES = TrackerTypes()
+
+# Trackers run when none are chosen explicitly; the fast extras are opt-in
+DEFAULT_TRACKERS = ['CSRT', 'KCF', 'Boosting', 'MIL']
+
+
+def default_trackers():
+    return [name for name in DEFAULT_TRACKERS if name in TRACKER_TYPES]
+
+
+register_tracker('CSRT', ['legacy.TrackerCSRT_create', 'TrackerCSRT_create'],
+                 (0, 255, 0), cost=5.0, gil_free=True)           # Green
+register_tracker('KCF', ['legacy.TrackerKCF_create', 'TrackerKCF_create'],
+                 (255, 0, 0), cost=1.0, gil_free=True)           # Blue
+register_tracker('Boosting', ['legacy.TrackerBoosting_create', 'TrackerBoosting_create'],
+                 (0, 255, 255), cost=4.0, gil_free=True)         # Yellow
+register_tracker('MIL', ['legacy.TrackerMIL_create', 'TrackerMIL_create'],
+                 (255, 0, 255), cost=6.0, gil_free=True)         # Magenta
+register_tracker('MOSSE', ['legacy.TrackerMOSSE_create', 'TrackerMOSSE_create'],
+                 (0, 165, 255), cost=0.05, gil_free=True)        # Orange
+register_tracker('MedianFlow', ['legacy.TrackerMedianFlow_create', 'TrackerMedianFlow_create'],
+                 (255, 255, 0), cost=0.5, gil_free=True)         # Cyan
@@ -0,0 +1,434 @@
+import math
+import statistics
+import time
+import threading
+import cv2
+from tracker_registry import TRACKERS, default_trackers
+
+
+def resize_frame(frame, target_width, target_height, pool=None):
+    # With a BufferPool the result is written into a recycled buffer
+    height, width = frame.shape[:2]
+    scale_width = target_width / width
+    scale_height = target_height / height
+    scale = min(scale_width, scale_height)
+    new_width = int(width * scale)
+    new_height = int(height * scale)
+    dst = pool.acquire((new_height, new_width) + frame.shape[2:], frame.dtype) if pool is not None else None
+    return cv2.resize(frame, (new_width, new_height), dst=dst, interpolation=cv2.INTER_AREA)
+
+
+class DownscaledFrames:
+    # Shares one downscaled copy of each frame between the trackers using it.
+    # Trackers copy what they need, so the copy is overwritten in place.
+    def __init__(self, scale):
+        self.scale = scale
+        self.lock = threading.Lock()
+        self.source = None
+        self.scaled = None
+
+    def get(self, frame):
+        with self.lock:
+            if frame is not self.source:
+                height, width = frame.shape[:2]
+                size = (max(1, round(width * self.scale)), max(1, round(height * self.scale)))
+                self.scaled = cv2.resize(frame, size, dst=self.scaled, interpolation=cv2.INTER_AREA)
+                self.source = frame
+            return self.scaled
+
+
+class ScaledTracker:
+    # Runs an OpenCV tracker on a downscaled frame and/or a padded crop around
+    # the target, mapping boxes to and from the caller's frame coordinates.
+    # Trackers keep their state in image coordinates, so the crop window only
+    # moves when the box nears its edge and the tracker is re-anchored then.
+    def __init__(self, factory, frames=None, crop_padding=None):
+        self.factory = factory
+        self.frames = frames
+        self.crop_padding = crop_padding
+        self.tracker = None
+        self.window = None
+        self.bbox = None
+        self.reanchors = 0
+
+    def _scaled(self, frame):
+        if self.frames is None:
+            return frame, 1.0, 1.0
+        scaled = self.frames.get(frame)
+        return scaled, scaled.shape[1] / frame.shape[1], scaled.shape[0] / frame.shape[0]
+
+    def _place_window(self, scaled, box):
+        x, y, w, h = box
+        pad_w, pad_h = w * self.crop_padding, h * self.crop_padding
+        height, width = scaled.shape[:2]
+        x0, y0 = max(0, int(x - pad_w)), max(0, int(y - pad_h))
+        x1, y1 = min(width, int(x + w + pad_w + 1)), min(height, int(y + h + pad_h + 1))
+        return x0, y0, x1, y1
+
+    def _needs_new_window(self, scaled, box):
+        x, y, w, h = box
+        x0, y0, x1, y1 = self.window
+        margin_w, margin_h = w * self.crop_padding / 2, h * self.crop_padding / 2
+        height, width = scaled.shape[:2]
+        return ((x - margin_w < x0 and x0 > 0) or (y - margin_h < y0 and y0 > 0) or
+                (x + w + margin_w > x1 and x1 < width) or (y + h + margin_h > y1 and y1 < height))
+
+    def _view(self, frame, anchor_box):
+        scaled, sx, sy = self._scaled(frame)
+        box = (anchor_box[0] * sx, anchor_box[1] * sy, anchor_box[2] * sx, anchor_box[3] * sy)
+        anchored = False
+        if self.crop_padding is not None:
+            if self.window is None or self._needs_new_window(scaled, box):
+                self.window = self._place_window(scaled, box)
+                anchored = True
+            x0, y0, x1, y1 = self.window
+            scaled = scaled[y0:y1, x0:x1]
+        else:
+            x0, y0 = 0, 0
+        return scaled, (x0, y0, sx, sy), (box[0] - x0, box[1] - y0, box[2], box[3]), anchored
+
+    def init(self, frame, bbox):
+        self.window = None
+        self.bbox = tuple(float(v) for v in bbox)
+        view, self.transform, view_box, _ = self._view(frame, self.bbox)
+        self.tracker = self.factory()
+        self.tracker.init(view, view_box)
+        return True
+
+    def update(self, frame):
+        view, (x0, y0, sx, sy), view_box, anchored = self._view(frame, self.bbox)
+        if anchored:
+            # The crop moved, so restart the tracker on the new window
+            self.tracker = self.factory()
+            self.tracker.init(view, view_box)
+            self.reanchors += 1
+        success, box = self.tracker.update(view)
+        if not success:
+            return False, box
+        x, y, w, h = box
+        self.bbox = ((x + x0) / sx, (y + y0) / sy, w / sx, h / sy)
+        return True, self.bbox
+
+
+def tracking_frames(frame, tracking_width=None):
+    # tracking_width sets the frame width the trackers see, independently of
+    # the display size
+    if tracking_width is not None and tracking_width < frame.shape[1]:
+        return DownscaledFrames(tracking_width / frame.shape[1])
+    return None
+
+
+def make_tracker(name, frame, bbox, frames=None, crop_padding=None):
+    # crop_padding tracks on a crop padded by that many box sizes on each side
+    if frames is None and crop_padding is None:
+        tracker = TRACKERS[name].create()
+        tracker.init(frame, tuple(int(v) for v in bbox))
+    else:
+        tracker = ScaledTracker(TRACKERS[name].create, frames, crop_padding)
+        tracker.init(frame, bbox)
+    return tracker
+
+
+def create_trackers(frame, bbox, names=None, tracking_width=None, crop_padding=None):
+    frames = tracking_frames(frame, tracking_width)
+    return {name: make_tracker(name, frame, bbox, frames, crop_padding) for name in names or default_trackers()}
+
+
+def timed_update(tracker, frame):
+    start = time.perf_counter()
+    success, bbox = tracker.update(frame)
+    return success, bbox, time.perf_counter() - start
+
+
+def update_trackers(tracker_items, frame, pool=None, spec=None):
+    # Returns [(name, success, bbox, seconds)] in the order of tracker_items.
+    # spec(name) gives the TrackerSpec: with a pool, trackers that hold the
+    # GIL run on the calling thread meanwhile, and the costliest are
+    # submitted first so the slowest job starts earliest.
+    if pool is None or len(tracker_items) < 2:
+        return [(name,) + timed_update(tracker, frame) for name, tracker in tracker_items]
+    pooled = [(name, tracker) for name, tracker in tracker_items if spec is None or spec(name).gil_free]
+    if spec is not None:
+        pooled.sort(key=lambda item: -spec(item[0]).cost)
+    futures = {name: pool.submit(timed_update, tracker, frame) for name, tracker in pooled}
+    inline = {name: timed_update(tracker, frame) for name, tracker in tracker_items if name not in futures}
+    # Collect in item order so results don't depend on completion order
+    return [(name,) + (futures[name].result() if name in futures else inline[name]) for name, _ in tracker_items]
+
+
+class TrackerState:
+    # One tracker following one target. A state replaying a cached
+    # trajectory has no tracker; a live one may carry a recorder.
+    # history maps frame number to the box shown on that frame (None if lost).
+    def __init__(self, name, tracker, bbox, cached=None):
+        self.name = name
+        self.tracker = tracker
+        self.bbox = bbox
+        self.success = True
+        self.cached = cached
+        self.recorder = None
+        self.history = {}
+        # A suspended tracker lost its target and isn't updated until it is
+        # re-acquired; last_bbox is where it was last seen
+        self.suspended = False
+        self.last_bbox = bbox
+        self.lost_for = 0
+        self.lost = 0
+        self.recovered = 0
+        self.suspended_frames = 0
+
+
+class Reacquirer:
+    # Looks for a lost target by matching the grayscale patch it was
+    # initialized from in a window around a candidate box. Matching runs on
+    # a copy reduced so the template is about template_size pixels across.
+    def __init__(self, frame, bbox, threshold=0.7, template_size=32, search_scale=2.0):
+        x, y, w, h = [int(v) for v in bbox]
+        x, y = max(x, 0), max(y, 0)
+        patch = cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY)
+        self.size = (patch.shape[1], patch.shape[0])
+        self.scale = min(1.0, template_size / max(self.size)) if min(self.size) > 0 else 1.0
+        self.template = cv2.resize(patch, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        self.threshold = threshold
+        self.search_scale = search_scale
+
+    def search(self, frame, bbox, reach=None):
+        # Returns (score, bbox) for a confident match within `reach` pixels of
+        # the centre of bbox, else None
+        w, h = self.size
+        if min(self.template.shape[:2]) < 4:
+            return None
+        cx, cy = bbox[0] + bbox[2] / 2, bbox[1] + bbox[3] / 2
+        reach = max(w, h) * self.search_scale if reach is None else reach
+        x0, y0 = max(0, int(cx - reach)), max(0, int(cy - reach))
+        x1, y1 = min(frame.shape[1], int(cx + reach)), min(frame.shape[0], int(cy + reach))
+        window = cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY)
+        window = cv2.resize(window, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        if window.shape[0] < self.template.shape[0] or window.shape[1] < self.template.shape[1]:
+            return None
+        result = cv2.matchTemplate(window, self.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (mx, my) = cv2.minMaxLoc(result)
+        if score < self.threshold:
+            return None
+        return score, (x0 + mx / self.scale, y0 + my / self.scale, float(w), float(h))
+
+
+def box_iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+
+class Target:
+    def __init__(self, target_id, bbox, trackers, tracking_width=None, crop_padding=None, reacquirer=None):
+        self.id = target_id
+        self.init_bbox = bbox
+        self.trackers = trackers
+        self.tracking_width = tracking_width
+        self.crop_padding = crop_padding
+        self.reacquirer = reacquirer
+
+    def contains(self, x, y):
+        boxes = [state.bbox for state in self.trackers.values() if state.bbox is not None] or [self.init_bbox]
+        return any(bx <= x <= bx + bw and by <= y <= by + bh for bx, by, bw, bh in boxes)
+
+    def consensus(self, min_trackers=2, min_iou=0.5):
+        # Median box of the trackers still following the target, if at
+        # least min_trackers of them agree with it
+        boxes = [state.bbox for state in self.trackers.values()
+                 if state.success and state.bbox is not None and not state.suspended]
+        if len(boxes) < min_trackers:
+            return None
+        xs, ys, ws, hs = zip(*boxes)
+        median = (statistics.median(xs), statistics.median(ys), statistics.median(ws), statistics.median(hs))
+        if all(box_iou(box, median) >= min_iou for box in boxes):
+            return median
+        return None
+
+
+class MultiTargetTracker:
+    # Targets can be added and removed between frames without touching the
+    # others; every (target, tracker) pair is scheduled as its own job.
+    # With a reacquire_interval, a tracker that fails is suspended instead of
+    # being updated blindly, and every reacquire_interval frames the
+    # surviving trackers' consensus or a template match is tried to restart it.
+    def __init__(self, reacquire_interval=5):
+        self.targets = {}
+        self.next_id = 1
+        self.frames = {}
+        self.reacquire_interval = reacquire_interval
+        self.reacquire_seconds = 0.0
+
+    def __len__(self):
+        return len(self.targets)
+
+    def add_target(self, frame, bbox, names=None, tracking_width=None, crop_padding=None, lookup=None):
+        # lookup(name) may return a cached trajectory to replay instead of tracking
+        if tracking_width not in self.frames:
+            self.frames[tracking_width] = tracking_frames(frame, tracking_width)
+        frames = self.frames[tracking_width]
+        trackers = {}
+        for name in names or default_trackers():
+            cached = lookup(name) if lookup is not None else None
+            if cached is not None:
+                trackers[name] = TrackerState(name, None, tuple(bbox), cached)
+            else:
+                tracker = make_tracker(name, frame, bbox, frames, crop_padding)
+                trackers[name] = TrackerState(name, tracker, tuple(bbox))
+        target = Target(self.next_id, tuple(bbox), trackers, tracking_width, crop_padding, Reacquirer(frame, bbox))
+        self.targets[target.id] = target
+        self.next_id += 1
+        return target
+
+    def remove_target(self, target_id):
+        return self.targets.pop(target_id, None)
+
+    def target_at(self, x, y):
+        for target in reversed(list(self.targets.values())):
+            if target.contains(x, y):
+                return target
+        return None
+
+    def states(self):
+        return [(target, state) for target in self.targets.values() for state in target.trackers.values()]
+
+    def suspending(self, state):
+        return self.reacquire_interval is not None and state.suspended
+
+    def keys(self):
+        # Pairs that are tracked live, i.e. not replayed from a cache or suspended
+        return [(target.id, state.name) for target, state in self.states()
+                if state.cached is None and not self.suspending(state)]
+
+    def update(self, frame, pool=None, due=None, frame_number=None):
+        # Returns [(target, state, seconds)] for the pairs that were tracked;
+        # `due` optionally restricts the update to those (target_id, name)
+        # keys. Cached states are replayed when frame_number is given.
+        pairs = {}
+        for target, state in self.states():
+            if state.cached is not None:
+                replay = state.cached.get(frame_number) if frame_number is not None else None
+                state.success, state.bbox = replay if replay is not None else (False, None)
+            elif not self.suspending(state):
+                pairs[(target.id, state.name)] = (target, state)
+        items = [(key, state.tracker) for key, (_, state) in pairs.items() if due is None or key in due]
+        results = []
+        for key, success, bbox, seconds in update_trackers(items, frame, pool, lambda key: TRACKERS[key[1]]):
+            target, state = pairs[key]
+            state.success = bool(success)
+            state.bbox = tuple(bbox) if success else None
+            if success:
+                state.last_bbox = state.bbox
+                state.suspended = False
+            elif self.reacquire_interval is not None:
+                state.suspended = True
+                state.lost_for = 0
+                state.lost += 1
+            if state.recorder is not None and frame_number is not None:
+                state.recorder.record(frame_number, state.success, state.bbox)
+            results.append((target, state, seconds))
+        if self.reacquire_interval is not None:
+            self.reacquire(frame, frame_number, {id(state) for _, state, _ in results})
+        if frame_number is not None:
+            for _, state in self.states():
+                state.history[frame_number] = state.bbox if state.success else None
+        return results
+
+    def reacquire(self, frame, frame_number=None, just_lost=()):
+        # Suspended trackers that weren't lost on this very frame count the
+        # frame as skipped; every reacquire_interval of them a restart is tried
+        start = time.perf_counter()
+        for target, state in self.states():
+            if not state.suspended or id(state) in just_lost:
+                continue
+            state.suspended_frames += 1
+            state.lost_for += 1
+            box = None
+            if state.lost_for % self.reacquire_interval == 0 and target.reacquirer is not None:
+                # The surviving trackers' consensus is only trusted if the
+                # target's appearance is found there too; otherwise search
+                # around the last sighting, wider with every attempt
+                size = max(target.reacquirer.size)
+                candidate = target.consensus()
+                match = target.reacquirer.search(frame, candidate, size / 2) if candidate is not None else None
+                if match is None:
+                    attempt = state.lost_for // self.reacquire_interval
+                    match = target.reacquirer.search(frame, state.last_bbox,
+                                                     size * target.reacquirer.search_scale * attempt)
+                box = match[1] if match is not None else None
+            if box is not None:
+                state.tracker = make_tracker(state.name, frame, box, self.frames.get(target.tracking_width),
+                                             target.crop_padding)
+                state.suspended = False
+                state.success = True
+                state.bbox = state.last_bbox = tuple(box)
+                state.recovered += 1
+            if state.recorder is not None and frame_number is not None:
+                state.recorder.record(frame_number, state.success, state.bbox)
+        self.reacquire_seconds = time.perf_counter() - start
+
+    def lost_report(self):
+        # {(target_id, name): {'lost', 'recovered', 'suspended_frames'}} for live pairs
+        return {(target.id, state.name): {'lost': state.lost, 'recovered': state.recovered,
+                                          'suspended_frames': state.suspended_frames}
+                for target, state in self.states() if state.cached is None}
+
+
+class RealtimeScheduler:
+    # Paces playback to the source frame rate. Frames whose display slot has
+    # already passed are reported as late so they can be dropped, and
+    # trackers that cost more than a frame interval are updated every
+    # `stride` frames with their last box carried forward in between.
+    def __init__(self, source_fps, smoothing=0.2):
+        self.frame_interval = 1.0 / source_fps if source_fps and source_fps >= 1 else 1.0 / 30
+        self.smoothing = smoothing
+        self.start_time = None
+        self.start_index = 0
+        self.cost = {}
+        self.last_update = {}
+        self.dropped_frames = 0
+        self.skipped_updates = {}
+
+    def start(self, frame_index):
+        # (Re)anchors the clock so frame_index + 1 is due now
+        self.start_time = time.perf_counter()
+        self.start_index = frame_index
+
+    def due_time(self, frame_index):
+        return self.start_time + (frame_index - self.start_index - 1) * self.frame_interval
+
+    def delay(self, frame_index):
+        return max(0.0, self.due_time(frame_index) - time.perf_counter())
+
+    def is_late(self, frame_index):
+        return time.perf_counter() > self.due_time(frame_index) + self.frame_interval
+
+    def drop(self):
+        self.dropped_frames += 1
+
+    def stride(self, name):
+        return max(1, math.ceil(self.cost.get(name, 0.0) / self.frame_interval))
+
+    def trackers_due(self, frame_index, names):
+        due = []
+        for name in names:
+            last = self.last_update.get(name)
+            if last is None or frame_index - last >= self.stride(name):
+                due.append(name)
+            else:
+                self.skipped_updates[name] = self.skipped_updates.get(name, 0) + 1
+        return due
+
+    def record(self, name, frame_index, seconds):
+        previous = self.cost.get(name)
+        self.cost[name] = seconds if previous is None else previous + self.smoothing * (seconds - previous)
+        self.last_update[name] = frame_index
+
+    def report(self):
+        return {
+            'dropped_frames': self.dropped_frames,
+            'skipped_updates': dict(self.skipped_updates),
+            'strides': {name: self.stride(name) for name in self.cost},
+        }
@@ -0,0 +1,158 @@
+import os
+import json
+import hashlib
+from functools import lru_cache
+import cv2
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.environ.get('TRACKER_CACHE_DIR',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'tracker_opencv', 'trajectories'))
+
+# Row status values; rows past the recorded range are never read
+STATUS_MISSING, STATUS_SUCCESS, STATUS_FAILED = 0, 1, 2
+
+
+def video_hash(path):
+    stat = os.stat(path)
+    return _file_hash(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=64)
+def _file_hash(path, size, mtime_ns):
+    # size and mtime are only part of the memo key; the digest is over content
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def trajectory_key(content_hash, start_frame, bbox, tracker, params=None):
+    data = {
+        'video': content_hash,
+        'start_frame': int(start_frame),
+        'bbox': [round(float(v), 3) for v in bbox],
+        'tracker': tracker,
+        'params': params or {},
+        'opencv': cv2.__version__,
+    }
+    return hashlib.blake2b(json.dumps(data, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+class CachedTrajectory:
+    # Memory-mapped (N, 5) float32 array of x, y, w, h, status; row i is
+    # frame start_frame + i
+    def __init__(self, boxes, start_frame):
+        self.boxes = boxes
+        self.start_frame = start_frame
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def get(self, frame_number):
+        # (success, bbox) for a recorded frame, or None if it isn't covered
+        i = frame_number - self.start_frame
+        if i < 0 or i >= len(self.boxes):
+            return None
+        row = self.boxes[i]
+        if row[4] == STATUS_MISSING:
+            return None
+        if row[4] == STATUS_FAILED:
+            return False, None
+        return True, tuple(float(v) for v in row[:4])
+
+
+class TrajectoryRecorder:
+    def __init__(self, start_frame, bbox):
+        self.start_frame = start_frame
+        self.rows = [tuple(float(v) for v in bbox) + (STATUS_SUCCESS,)]
+        self.valid = True
+
+    def record(self, frame_number, success, bbox):
+        i = frame_number - self.start_frame
+        if i != len(self.rows):
+            # A skipped or repeated frame means this isn't a full-rate run
+            self.valid = False
+            return
+        if success:
+            self.rows.append(tuple(float(v) for v in bbox) + (STATUS_SUCCESS,))
+        else:
+            self.rows.append((0.0, 0.0, 0.0, 0.0, STATUS_FAILED))
+
+    def array(self):
+        return np.asarray(self.rows, dtype=np.float32).reshape(-1, 5)
+
+
+class TrajectoryCache:
+    # Directory of <key>.npy trajectories with <key>.json metadata. Entries
+    # are written atomically and evicted least-recently-used first once the
+    # directory exceeds max_bytes, so GUI and batch processes can share it.
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key, ext):
+        return os.path.join(self.directory, key + ext)
+
+    def load(self, key):
+        try:
+            with open(self._path(key, '.json')) as f:
+                meta = json.load(f)
+            boxes = np.load(self._path(key, '.npy'), mmap_mode='r')
+            # Marks the entry as recently used; an entry evicted in the
+            # meantime by another process is a miss
+            os.utime(self._path(key, '.json'))
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CachedTrajectory(boxes, meta['start_frame'])
+
+    def store(self, key, recorder, meta=None):
+        if not recorder.valid:
+            return False
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._path(key, f'.{os.getpid()}.tmp.npy')
+        np.save(tmp, recorder.array())
+        os.replace(tmp, self._path(key, '.npy'))
+        meta = dict(meta or {}, start_frame=recorder.start_frame, frames=len(recorder.rows))
+        tmp = self._path(key, f'.{os.getpid()}.tmp.json')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._path(key, '.json'))
+        self.evict()
+        return True
+
+    def evict(self):
+        if not os.path.isdir(self.directory):
+            return
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json') or '.tmp.' in name:
+                continue
+            key = name[:-5]
+            try:
+                size = os.path.getsize(self._path(key, '.npy')) + os.path.getsize(self._path(key, '.json'))
+                entries.append((os.path.getmtime(self._path(key, '.json')), size, key))
+            except OSError:
+                continue
+            total += size
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for ext in ('.json', '.npy'):
+                try:
+                    os.remove(self._path(key, ext))
+                except OSError:
+                    pass
+            total -= size
+
+    def clear(self):
+        self.max_bytes, limit = 0, self.max_bytes
+        try:
+            self.evict()
+        finally:
+            self.max_bytes = limit
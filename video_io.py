@@ -0,0 +1,342 @@
+import os
+import sys
+import time
+import queue
+import threading
+from collections import deque, OrderedDict
+import cv2
+import numpy as np
+from trajectory_cache import video_hash
+
+FRAME_INDEX_DIR = os.environ.get('TRACKER_INDEX_DIR',
+                                 os.path.join(os.path.expanduser('~'), '.cache', 'tracker_opencv', 'frame_index'))
+
+
+class FrameIndex:
+    # Presentation timestamp of every frame, from one sequential pass over
+    # the video. Persisted by content hash so each video is scanned once.
+    def __init__(self, path, directory=FRAME_INDEX_DIR):
+        self.path = path
+        self.directory = directory
+        self.timestamps = None
+        self.reliable = False
+        self.content_hash = None
+        self._thread = None
+
+    def __len__(self):
+        return 0 if self.timestamps is None else len(self.timestamps)
+
+    @property
+    def ready(self):
+        return self.timestamps is not None
+
+    def start(self):
+        # Loads or builds the index in the background
+        if self._thread is None and not self.ready:
+            self._thread = threading.Thread(target=self.load_or_build, name='FrameIndex', daemon=True)
+            self._thread.start()
+
+    def load_or_build(self):
+        # The content hash is kept for other users of it, e.g. the trajectory cache
+        self.content_hash = video_hash(self.path)
+        index_path = os.path.join(self.directory, self.content_hash + '.npy')
+        try:
+            timestamps = np.load(index_path)
+        except (OSError, ValueError):
+            timestamps = self.scan()
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = index_path + f'.{os.getpid()}.tmp.npy'
+            np.save(tmp, timestamps)
+            os.replace(tmp, index_path)
+        self.set_timestamps(timestamps)
+
+    def set_timestamps(self, timestamps):
+        # Timestamps are only usable for verifying seeks if they increase
+        self.reliable = len(timestamps) > 1 and bool(np.all(np.diff(timestamps) > 0))
+        self.timestamps = timestamps
+
+    def scan(self):
+        cap = cv2.VideoCapture(self.path)
+        timestamps = []
+        try:
+            while cap.grab():
+                timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+        finally:
+            cap.release()
+        return np.asarray(timestamps, dtype=np.float64)
+
+    def frame_at(self, msec):
+        # Frame number whose timestamp is closest to msec
+        i = int(np.searchsorted(self.timestamps, msec))
+        if i >= len(self.timestamps) or (i > 0 and msec - self.timestamps[i - 1] < self.timestamps[i] - msec):
+            i -= 1
+        return i
+
+
+def read_frame_at(cap, frame_number, index=None):
+    # Frame-accurate random access. The backend seeks to frame_number; the
+    # decoded timestamp is then checked against the index, stepping forward
+    # or restarting further back when the seek landed on the wrong frame.
+    # Leaves cap positioned at frame_number + 1.
+    if index is None or not index.ready or not index.reliable:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        return cap.read()
+    backoff = 0
+    while True:
+        start = max(0, frame_number - backoff)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        if not cap.grab():
+            return False, None
+        current = index.frame_at(cap.get(cv2.CAP_PROP_POS_MSEC))
+        if current <= frame_number or start == 0:
+            while current < frame_number:
+                if not cap.grab():
+                    return False, None
+                current += 1
+            return cap.retrieve()
+        backoff = max(16, backoff * 2)
+
+
+class BufferPool:
+    # Reusable frame-sized arrays. A buffer is handed out again only once the
+    # pool holds the last reference to it, so frames still kept by the frame
+    # cache, a prefetch or writer queue or the display are never overwritten.
+    def __init__(self, max_buffers=256):
+        self.max_buffers = max_buffers
+        self.allocated = 0
+        self._buffers = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._buffers)
+
+    def acquire(self, shape, dtype=np.uint8):
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        with self._lock:
+            stale = None
+            for i in range(len(self._buffers)):
+                buffer = self._buffers[i]
+                # References: the list, the local name and getrefcount's argument
+                if sys.getrefcount(buffer) > 3:
+                    continue
+                if buffer.shape == shape and buffer.dtype == dtype:
+                    return buffer
+                stale = i
+            buffer = np.empty(shape, dtype)
+            self.allocated += 1
+            # A free buffer of another size (the resolution changed) makes room
+            if stale is not None:
+                self._buffers[stale] = buffer
+            elif len(self._buffers) < self.max_buffers:
+                self._buffers.append(buffer)
+            return buffer
+
+    def clear(self):
+        with self._lock:
+            self._buffers = []
+
+
+class FrameCache:
+    # Bounded LRU of decoded (resized) frames keyed by frame number
+    def __init__(self, max_frames=120):
+        self.max_frames = max_frames
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._frames)
+
+    def get(self, frame_number):
+        with self._lock:
+            frame = self._frames.get(frame_number)
+            if frame is not None:
+                self._frames.move_to_end(frame_number)
+            return frame
+
+    def put(self, frame_number, frame):
+        with self._lock:
+            self._frames[frame_number] = frame
+            self._frames.move_to_end(frame_number)
+            while len(self._frames) > self.max_frames:
+                self._frames.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+
+class FramePrefetcher:
+    # Decodes (and optionally transforms) frames on a background thread into a
+    # bounded buffer. Stopping keeps already decoded frames so playback can
+    # resume without seeking; the owner must not touch cap while it runs.
+    def __init__(self, cap, transform=None, capacity=8, profiler=None, frame_cache=None, index=None):
+        self.cap = cap
+        self.transform = transform
+        self.capacity = max(1, capacity)
+        self.profiler = profiler
+        self.frame_cache = frame_cache
+        self.index = index
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._next_frame = None
+        self._pending_seek = None
+        self.eof = False
+
+    def __len__(self):
+        with self._cond:
+            return len(self._buffer)
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None or self.eof:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='FramePrefetcher', daemon=True)
+        self._thread.start()
+
+    def seek(self, frame_number):
+        # Drops buffered frames; the next read after start() is frame_number.
+        # The capture is repositioned on the prefetch thread.
+        self.clear()
+        self._pending_seek = frame_number
+        self._next_frame = frame_number
+
+    def _run(self):
+        if self._pending_seek is not None:
+            if self._pending_seek > 0:
+                read_frame_at(self.cap, self._pending_seek - 1, self.index)
+            else:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self._pending_seek = None
+        if self._next_frame is None:
+            self._next_frame = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        raw = None
+        while True:
+            with self._cond:
+                while self._running and len(self._buffer) >= self.capacity:
+                    self._cond.wait()
+                if not self._running:
+                    return
+            start = time.perf_counter()
+            # A transformed frame is a new array, so the decoded one can be reused
+            ret, frame = self.cap.read(raw if self.transform is not None else None)
+            if not ret:
+                with self._cond:
+                    self.eof = True
+                    self._cond.notify_all()
+                return
+            decoded = time.perf_counter()
+            frame_number = self._next_frame
+            self._next_frame += 1
+            if self.transform is not None:
+                raw = frame
+                frame = self.transform(frame)
+                if frame is raw:
+                    raw = None
+            if self.profiler is not None:
+                self.profiler.add('decode', decoded - start)
+                self.profiler.add('resize', time.perf_counter() - decoded)
+            if self.frame_cache is not None:
+                self.frame_cache.put(frame_number, frame)
+            with self._cond:
+                # Items carry the capture position after the read, as cap.get does
+                self._buffer.append((frame_number + 1, frame))
+                self._cond.notify_all()
+
+    def read(self, timeout=None):
+        # Returns (True, (frame_index, frame)) or (False, None) once the
+        # buffer is empty and nothing more is coming.
+        with self._cond:
+            while not self._buffer and not self.eof and self._thread is not None:
+                if not self._cond.wait(timeout):
+                    break
+            if self._buffer:
+                item = self._buffer.popleft()
+                self._cond.notify_all()
+                return True, item
+            return False, None
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def clear(self):
+        # Callers that move cap themselves must also clear
+        self.stop()
+        with self._cond:
+            self._buffer.clear()
+            self.eof = False
+            self._next_frame = None
+            self._pending_seek = None
+
+
+class AsyncVideoWriter:
+    # Drop-in for cv2.VideoWriter that encodes on a dedicated thread. With the
+    # 'block' policy write() waits for queue space, so the output is identical
+    # to writing inline; 'drop' discards frames while the queue is full.
+    POLICIES = ('block', 'drop')
+
+    def __init__(self, path, fourcc, fps, size, queue_size=64, policy='block', profiler=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f'Unknown writer policy {policy!r}')
+        self.policy = policy
+        self.profiler = profiler
+        self.writer = cv2.VideoWriter(path, fourcc, fps, size)
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._thread = threading.Thread(target=self._run, name='AsyncVideoWriter', daemon=True)
+        self._thread.start()
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    def isOpened(self):
+        return self.writer.isOpened()
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                return
+            start = time.perf_counter()
+            self.writer.write(frame)
+            self.written += 1
+            if self.profiler is not None:
+                self.profiler.add('encode', time.perf_counter() - start)
+
+    def write(self, frame):
+        # The frame is encoded later, so callers must not modify it afterwards
+        if self._thread is None:
+            raise RuntimeError('write() called on a released writer')
+        if self.policy == 'drop':
+            try:
+                self._queue.put_nowait(frame)
+            except queue.Full:
+                self.dropped += 1
+                return False
+        else:
+            self._queue.put(frame)
+        return True
+
+    def release(self):
+        # Flushes every queued frame before closing the file
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self.writer.release()